@@ -36,8 +36,8 @@ class AdBot(CellAgent):
 
     def find_target_posts(self):
         # 寻找周围3格内的原始文章
-        nearby_cells = self.cell.get_neighbors(3)
-        self.target_posts = [cell for cell in nearby_cells if isinstance(cell.agent, OriginalPost)]
+        nearby_cells = self.cell.get_neighborhood(radius=3)
+        self.target_posts = nearby_cells.select(agent_type=OriginalPost).cells
 
     def publish_ads(self):
         if self.random.random() < self.publish_prob:
@@ -71,7 +71,7 @@ class HumanUser(CellAgent):
 
     def interact_with_ads(self):
         current_cell = self.cell
-        ads_in_cell = [a for a in current_cell.agents if isinstance(a, AdPost)]
+        ads_in_cell = current_cell.agents_of_type(AdPost)
         if ads_in_cell:
             ad = self.random.choice(ads_in_cell)
             action = self.random.choices(['like', 'buy', 'report'],
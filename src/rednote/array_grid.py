@@ -0,0 +1,676 @@
+"""Grids that keep their cell state in contiguous NumPy arrays.
+
+The dict based spaces create one `Cell` object (with its own agent list, connection
+dict and property dict) per position, so a 1000x1000 grid costs a million objects
+before the first agent is placed. `ArrayGrid` instead stores:
+- occupancy and capacity of every cell in flat NumPy arrays indexed by a cell id
+- per cell properties as flat NumPy property layers
+- agent lists only for cells that have been occupied at least once
+
+Cells are identified by their flat id (the row-major index of their coordinate).
+`ArrayCell` objects are lightweight views that are only created when user code asks
+for a cell, e.g. through indexing, iteration, neighborhoods or agent placement, and
+they behave like normal cells for agents, movement and collections. Because the
+connectivity of a grid is given by a fixed set of offsets, neighborhood tables are
+built for all cells at once with array arithmetic.
+
+The connectivity lives in an immutable, interned `GridTopology` that is shared by all
+grids of the same shape. Pickling or deep copying a grid therefore only copies its
+occupancy, capacity and property arrays plus the agent lists of occupied cells, and
+restoring it does not rebuild any connections or neighborhood tables.
+"""
+
+from __future__ import annotations
+
+import math
+import weakref
+from collections.abc import Collection, Iterator, MutableMapping, Sequence
+from itertools import product
+from random import Random
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import numpy as np
+
+from cell import AgentsView, Cell, Coordinate
+from cell_collection import CellCollection
+from discrete_space import DiscreteSpace
+from neighborhood import NeighborhoodIndex, NeighborhoodTable
+
+if TYPE_CHECKING:
+    from cell_agent import CellAgent
+
+T = TypeVar("T", bound="ArrayCell")
+
+
+def _unpickle_array_cell(cell_klass: type[ArrayCell], space: ArrayGrid, cell_id: int):
+    """Helper function for unpickling ArrayCell instances."""
+    cell = cell_klass.__new__(cell_klass)
+    cell.space = space
+    cell._id = cell_id
+    return cell
+
+
+class _CellProperties(MutableMapping):
+    """Dict like access to the property layer values of a single cell."""
+
+    __slots__ = ["_id", "_space"]
+
+    def __init__(self, space: ArrayGrid, cell_id: int) -> None:
+        self._space = space
+        self._id = cell_id
+
+    def __getitem__(self, key: str) -> Any:
+        return self._space.property_layers[key][self._id].item()
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self._space.property_layers:
+            self._space.create_property_layer(key, dtype=np.asarray(value).dtype)
+        self._space.property_layers[key][self._id] = value
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("property layers cannot be removed through a cell")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._space.property_layers)
+
+    def __len__(self) -> int:
+        return len(self._space.property_layers)
+
+
+class ArrayCell(Cell):
+    """A view onto a single cell of an `ArrayGrid`.
+
+    All state lives in the grid, the view only holds the grid and the flat id of the
+    cell. Two views are equal if they refer to the same id of the same grid, so views
+    can be created and discarded freely.
+
+    Attributes:
+        space (ArrayGrid): the grid this cell belongs to
+        coordinate (Tuple[int, ...]) : the position of the cell in the grid
+        capacity (int): the maximum number of agents that can simultaneously occupy the cell
+        random (Random): the random number generator of the grid
+
+    """
+
+    __slots__ = ["_id"]
+
+    def __init__(self, space: ArrayGrid, cell_id: int) -> None:  # noqa: D107
+        self.space = space
+        self._id = cell_id
+
+    @property
+    def coordinate(self) -> Coordinate:  # noqa: D102
+        return self.space._coordinate_of(self._id)
+
+    @property
+    def capacity(self) -> int | None:  # noqa: D102
+        capacity = self.space._capacities[self._id]
+        return None if math.isinf(capacity) else int(capacity)
+
+    @capacity.setter
+    def capacity(self, value: int | None) -> None:
+        self.space._capacities[self._id] = math.inf if value is None else value
+
+    @property
+    def random(self) -> Random:  # noqa: D102
+        return self.space.random
+
+    @property
+    def properties(self) -> _CellProperties:  # noqa: D102
+        return _CellProperties(self.space, self._id)
+
+    @property
+    def connections(self) -> dict[Coordinate, ArrayCell]:  # noqa: D102
+        space = self.space
+        return {
+            offset: space._cell_at(neighbor)
+            for offset, neighbor in space._connections_of(self._id)
+        }
+
+    @property
+    def _agents(self) -> Sequence[CellAgent]:
+        # read only, the list of a cell is only created when an agent enters it
+        return self.space._agents_at(self._id)
+
+    def connect(self, other: Cell, key: Coordinate | None = None) -> None:  # noqa: D102
+        raise ValueError("Cannot change connections of a cell in an ArrayGrid")
+
+    def disconnect(self, other: Cell) -> None:  # noqa: D102
+        raise ValueError("Cannot change connections of a cell in an ArrayGrid")
+
+    def add_agent(self, agent: CellAgent) -> None:
+        """Adds an agent to the cell.
+
+        Args:
+            agent (CellAgent): agent to add to this Cell
+
+        """
+        self.space._add_agent(self._id, agent)
+
+    def remove_agent(self, agent: CellAgent) -> None:
+        """Removes an agent from the cell.
+
+        Args:
+            agent (CellAgent): agent to remove from this cell
+
+        """
+        self.space._remove_agent(self._id, agent)
+
+    def _remove_agents(self, agents: Collection[CellAgent]) -> None:
+        self.space._remove_agents(self._id, agents)
+
+    @property
+    def is_empty(self) -> bool:
+        """Returns a bool of the contents of a cell."""
+        return bool(self.space._occupancy[self._id] == 0)
+
+    @property
+    def is_full(self) -> bool:
+        """Returns a bool of the contents of a cell."""
+        space = self.space
+        return bool(space._occupancy[self._id] == space._capacities[self._id])
+
+    @property
+    def agents(self) -> AgentsView:
+        """Returns a read-only view of the agents occupying the cell."""
+        return AgentsView(self.space._agents_at(self._id))
+
+    def count_agents(self, agent_type: type | tuple[type, ...] | None = None) -> int:
+        """Returns the number of agents in the cell, optionally only those of a type.
+
+        Args:
+            agent_type: agent class or tuple of agent classes to count
+
+        """
+        space = self.space
+        if agent_type is None:
+            return int(space._occupancy[self._id])
+        return sum(
+            int(counts[self._id])
+            for klass, counts in space._type_counts.items()
+            if issubclass(klass, agent_type)
+        )
+
+    def has_agent_type(self, agent_type: type | tuple[type, ...]) -> bool:
+        """Returns whether the cell contains an agent of the given type.
+
+        Args:
+            agent_type: agent class or tuple of agent classes
+
+        """
+        return any(
+            counts[self._id]
+            for klass, counts in self.space._type_counts.items()
+            if issubclass(klass, agent_type)
+        )
+
+    def __eq__(self, other: object) -> bool:  # noqa: D105
+        if not isinstance(other, ArrayCell):
+            return NotImplemented
+        return self._id == other._id and self.space is other.space
+
+    def __hash__(self) -> int:  # noqa: D105
+        return hash(self._id)
+
+    def __reduce__(self):  # noqa: D105
+        return _unpickle_array_cell, (type(self), self.space, self._id)
+
+
+_topologies: weakref.WeakValueDictionary[tuple, GridTopology] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _intern_topology(
+    dimensions: tuple[int, ...], torus: bool, offsets: tuple[Coordinate, ...]
+) -> GridTopology:
+    """Return the shared topology for the given key, creating it if needed."""
+    key = (dimensions, torus, offsets)
+    try:
+        return _topologies[key]
+    except KeyError:
+        topology = _topologies[key] = GridTopology(dimensions, torus, offsets)
+        return topology
+
+
+class GridTopology:
+    """The immutable connectivity of an `ArrayGrid`: its shape, wrapping and neighbor offsets.
+
+    Topologies are interned, so all grids with the same dimensions, wrapping and offsets
+    share one instance and with it the neighborhood tables built for any of them.
+    Copying a topology returns the same instance and pickling it only stores its key,
+    so snapshots and forks of a grid never copy or rebuild its connectivity.
+
+    Attributes:
+        dimensions (tuple[int, ...]): the dimensions of the grid
+        torus (bool): whether the grid wraps
+        offsets (np.ndarray): the offsets of the direct neighbors of a cell, read only
+        strides (np.ndarray): the row-major strides mapping coordinates onto cell ids, read only
+        neighborhood_index (NeighborhoodIndex): the neighborhood tables of the topology
+
+    """
+
+    def __init__(
+        self,
+        dimensions: tuple[int, ...],
+        torus: bool,
+        offsets: tuple[Coordinate, ...],
+    ) -> None:
+        """Initialize a GridTopology, use `_intern_topology` to get a shared instance.
+
+        Args:
+            dimensions: the dimensions of the grid
+            torus: whether the grid wraps
+            offsets: the offsets of the direct neighbors of a cell
+        """
+        self._key = (dimensions, torus, offsets)
+        self.dimensions = dimensions
+        self.torus = torus
+        self.ndims = len(dimensions)
+        self.num_cells = math.prod(dimensions)
+        self.strides = np.array(
+            [math.prod(dimensions[i + 1 :]) for i in range(self.ndims)],
+            dtype=np.int64,
+        )
+        self.stride_list = self.strides.tolist()
+        self.offsets = np.array(offsets, dtype=np.int64).reshape(-1, self.ndims)
+        self.strides.flags.writeable = False
+        self.offsets.flags.writeable = False
+        self._ball_offsets_cache: dict[int, np.ndarray] = {}
+        self.neighborhood_index = NeighborhoodIndex(self)
+
+    def wrap(self, coordinates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Map coordinates of shape (..., ndims) onto flat ids.
+
+        Returns:
+            the flat ids and a boolean mask of the coordinates that lie inside the grid
+
+        """
+        dims = np.array(self.dimensions, dtype=np.int64)
+        if self.torus:
+            coordinates = coordinates % dims
+            valid = np.ones(coordinates.shape[:-1], dtype=bool)
+        else:
+            valid = np.all((coordinates >= 0) & (coordinates < dims), axis=-1)
+            coordinates = np.where(valid[..., None], coordinates, 0)
+        return coordinates @ self.strides, valid
+
+    def ball_offsets(self, radius: int) -> np.ndarray:
+        """Return all offsets reachable in at most radius steps, excluding the origin."""
+        try:
+            return self._ball_offsets_cache[radius]
+        except KeyError:
+            pass
+        ball = np.zeros((1, self.ndims), dtype=np.int64)
+        for _ in range(radius):
+            ball = np.unique(
+                np.concatenate(
+                    [ball, (ball[:, None, :] + self.offsets[None, :, :]).reshape(-1, self.ndims)]
+                ),
+                axis=0,
+            )
+        ball = ball[np.any(ball != 0, axis=1)]
+        self._ball_offsets_cache[radius] = ball
+        return ball
+
+    def _build_neighborhood_table(self, radius: int) -> NeighborhoodTable:
+        """Build the neighborhoods of all cells by applying the ball offsets to all ids at once.
+
+        Cells are processed in chunks to bound the size of the temporary
+        (cells x offsets) arrays.
+        """
+        offsets = self.ball_offsets(radius)
+        dims = np.array(self.dimensions, dtype=np.int64)
+        # on small tori different offsets can wrap onto the same cell
+        may_wrap = self.torus and any(2 * radius + 1 > d for d in self.dimensions)
+        chunk_size = max(1, 2**20 // len(offsets))
+
+        counts, rows = [], []
+        for start in range(0, self.num_cells, chunk_size):
+            ids = np.arange(start, min(start + chunk_size, self.num_cells))
+            coordinates = (ids[:, None] // self.strides) % dims
+            neighbors, valid = self.wrap(coordinates[:, None, :] + offsets[None, :, :])
+            valid &= neighbors != ids[:, None]
+            if may_wrap:
+                neighbors = np.sort(np.where(valid, neighbors, -1), axis=1)
+                valid = neighbors >= 0
+                valid[:, 1:] &= neighbors[:, 1:] != neighbors[:, :-1]
+            counts.append(valid.sum(axis=1))
+            rows.append(neighbors[valid])
+        return NeighborhoodTable.from_rows(radius, counts, rows)
+
+    def __reduce__(self):  # noqa: D105
+        return _intern_topology, self._key
+
+    def __copy__(self) -> GridTopology:  # noqa: D105
+        return self
+
+    def __deepcopy__(self, memo: dict) -> GridTopology:  # noqa: D105
+        return self
+
+
+class ArrayGrid(DiscreteSpace[T]):
+    """Base class for grids that store their cells in NumPy arrays.
+
+    Subclasses define the connectivity by implementing `_neighbor_offsets`.
+
+    Attributes:
+        dimensions (Sequence[int]): the dimensions of the grid
+        torus (bool): whether the grid is a torus
+        capacity (int): the capacity of a grid cell
+        random (Random): the random number generator
+        property_layers (dict[str, np.ndarray]): flat property arrays indexed by cell id
+
+    Notes:
+        width and height are accessible via properties, higher dimensions can be retrieved via dimensions
+
+    """
+
+    @property
+    def width(self) -> int:
+        """Convenience access to the width of the grid."""
+        return self.dimensions[0]
+
+    @property
+    def height(self) -> int:
+        """Convenience access to the height of the grid."""
+        return self.dimensions[1]
+
+    def __init__(
+        self,
+        dimensions: Sequence[int],
+        torus: bool = False,
+        capacity: float | None = None,
+        random: Random | None = None,
+        cell_klass: type[T] = ArrayCell,
+    ) -> None:
+        """Initialise the grid class.
+
+        Args:
+            dimensions: the dimensions of the space
+            torus: whether the space wraps
+            capacity: capacity of the grid cell
+            random: a random number generator
+            cell_klass: the view class to use for the cells
+        """
+        super().__init__(capacity=capacity, random=random, cell_klass=cell_klass)
+        self.torus = torus
+        self.dimensions = tuple(dimensions)
+        self._ndims = len(self.dimensions)
+        self._validate_parameters()
+
+        self._topology = _intern_topology(
+            self.dimensions, torus, tuple(map(tuple, self._neighbor_offsets()))
+        )
+        self._num_cells = self._topology.num_cells
+        self._stride_list = self._topology.stride_list
+
+        self._occupancy = np.zeros(self._num_cells, dtype=np.int32)
+        # per concrete agent class occupancy, allocated when the first agent of a class arrives
+        self._type_counts: dict[type, np.ndarray] = {}
+        self._capacities = np.full(
+            self._num_cells, math.inf if capacity is None else capacity, dtype=float
+        )
+        # agent lists (and the slot of each agent in its list, for constant time
+        # swap-pop removal) are only created for cells that have been occupied
+        self._agents: list[list[CellAgent] | None] = [None] * self._num_cells
+        self._slots: list[dict[CellAgent, int] | None] = [None] * self._num_cells
+
+        # empties index: the first _num_empty entries of _empty_ids are the empty
+        # cells, _empty_pos maps a cell id to its position there (-1 if occupied)
+        id_dtype = np.int32 if self._num_cells < np.iinfo(np.int32).max else np.int64
+        self._empty_ids = np.arange(self._num_cells, dtype=id_dtype)
+        self._empty_pos = np.arange(self._num_cells, dtype=id_dtype)
+        self._num_empty = self._num_cells
+        self.property_layers: dict[str, np.ndarray] = {}
+
+    def _neighbor_offsets(self) -> list[tuple[int, ...]]:
+        raise NotImplementedError
+
+    def _validate_parameters(self):
+        if not all(isinstance(dim, int) and dim > 0 for dim in self.dimensions):
+            raise ValueError("Dimensions must be a list of positive integers.")
+        if not isinstance(self.torus, bool):
+            raise ValueError("Torus must be a boolean.")
+        if self.capacity is not None and not isinstance(self.capacity, float | int):
+            raise ValueError("Capacity must be a number or None.")
+
+    def create_property_layer(
+        self, name: str, default_value: Any = 0, dtype: Any = float
+    ) -> np.ndarray:
+        """Add a flat property layer to the grid.
+
+        Args:
+            name: name of the property layer
+            default_value: initial value of every cell
+            dtype: NumPy dtype of the layer
+
+        Returns:
+            the flat layer, use ``layer.reshape(grid.dimensions)`` for a grid shaped view
+
+        """
+        if name in self.property_layers:
+            raise ValueError(f"Property layer {name} already exists.")
+        layer = np.full(self._num_cells, default_value, dtype=dtype)
+        self.property_layers[name] = layer
+        return layer
+
+    # cell ids and views
+
+    def _id_of(self, coordinate: Coordinate) -> int:
+        if len(coordinate) != self._ndims or not all(
+            0 <= c < d for c, d in zip(coordinate, self.dimensions)
+        ):
+            raise KeyError(coordinate)
+        cell_id = 0
+        for c, stride in zip(coordinate, self._stride_list):
+            cell_id += c * stride
+        return cell_id
+
+    def _coordinate_of(self, cell_id: int) -> Coordinate:
+        coordinate = []
+        for dim in reversed(self.dimensions):
+            cell_id, c = divmod(cell_id, dim)
+            coordinate.append(c)
+        return tuple(reversed(coordinate))
+
+    def _id_of_cell(self, cell: T) -> int:
+        return cell._id
+
+    def _cell_at(self, cell_id: int) -> T:
+        return self.cell_klass(self, cell_id)
+
+    def _agents_at(self, cell_id: int) -> Sequence[CellAgent]:
+        return self._agents[cell_id] or ()
+
+    def _agent_list(self, cell_id: int) -> list[CellAgent]:
+        agents = self._agents[cell_id]
+        if agents is None:
+            agents = self._agents[cell_id] = []
+            self._slots[cell_id] = {}
+        return agents
+
+    def _occupancy_of(self, ids: np.ndarray) -> np.ndarray:
+        return self._occupancy[ids]
+
+    def _capacity_of(self, ids: np.ndarray) -> np.ndarray:
+        return self._capacities[ids]
+
+    def _count_of(
+        self, ids: np.ndarray, agent_type: type | tuple[type, ...]
+    ) -> np.ndarray:
+        counts = np.zeros(len(ids), dtype=np.int64)
+        for klass, klass_counts in self._type_counts.items():
+            if issubclass(klass, agent_type):
+                counts += klass_counts[ids]
+        return counts
+
+    def _property_of(self, ids: np.ndarray, name: str) -> np.ndarray:
+        return self.property_layers[name][ids]
+
+    def __iter__(self) -> Iterator[T]:  # noqa
+        return map(self._cell_at, range(self._num_cells))
+
+    def __getitem__(self, key: Coordinate) -> T:  # noqa: D105
+        return self._cell_at(self._id_of(key))
+
+    def __len__(self) -> int:  # noqa: D105
+        return self._num_cells
+
+    @property
+    def all_cells(self) -> CellCollection[T]:
+        """Return a lazy collection of all cells in space."""
+        return CellCollection._from_ids(self, np.arange(self._num_cells)).lazy()
+
+    @property
+    def empties(self) -> CellCollection[T]:
+        """Return all empty in spaces."""
+        return CellCollection._from_ids(
+            self, self._empty_ids[: self._num_empty].copy()
+        )
+
+    @property
+    def empty_count(self) -> int:
+        """Return the number of empty cells."""
+        return self._num_empty
+
+    def select_random_empty_cell(self) -> T:
+        """Select random empty cell."""
+        if not self._num_empty:
+            raise IndexError("Cannot choose from an empty sequence")
+        return self._cell_at(
+            int(self._empty_ids[self.random.randrange(self._num_empty)])
+        )
+
+    # occupancy
+
+    def _add_agent(self, cell_id: int, agent: CellAgent) -> None:
+        if self._occupancy[cell_id] >= self._capacities[cell_id]:
+            raise Exception(
+                "ERROR: Cell is full"
+            )  # FIXME we need MESA errors or a proper error
+        agents = self._agent_list(cell_id)
+        self._slots[cell_id][agent] = len(agents)
+        agents.append(agent)
+        self._occupancy[cell_id] += 1
+        klass = type(agent)
+        try:
+            self._type_counts[klass][cell_id] += 1
+        except KeyError:
+            counts = self._type_counts[klass] = np.zeros(self._num_cells, dtype=np.int32)
+            counts[cell_id] = 1
+        if self._occupancy[cell_id] == 1:
+            # swap-remove the cell from the empties index
+            pos = self._empty_pos[cell_id]
+            self._num_empty -= 1
+            last = self._empty_ids[self._num_empty]
+            self._empty_ids[pos] = last
+            self._empty_pos[last] = pos
+            self._empty_pos[cell_id] = -1
+
+    def _remove_agent(self, cell_id: int, agent: CellAgent) -> None:
+        self._pop_agent(cell_id, agent)
+        if self._occupancy[cell_id] == 0:
+            self._mark_empty_id(cell_id)
+
+    def _remove_agents(self, cell_id: int, agents: Collection[CellAgent]) -> None:
+        for agent in agents:
+            self._pop_agent(cell_id, agent)
+        if self._occupancy[cell_id] == 0:
+            self._mark_empty_id(cell_id)
+
+    def _pop_agent(self, cell_id: int, agent: CellAgent) -> None:
+        slots = self._slots[cell_id]
+        try:
+            slot = slots.pop(agent)
+        except (KeyError, AttributeError):
+            raise ValueError(
+                f"{agent} is not in cell {self._coordinate_of(cell_id)}"
+            ) from None
+        agents = self._agents[cell_id]
+        last = agents.pop()
+        if last is not agent:
+            agents[slot] = last
+            slots[last] = slot
+        self._occupancy[cell_id] -= 1
+        self._type_counts[type(agent)][cell_id] -= 1
+
+    def _mark_empty_id(self, cell_id: int) -> None:
+        self._empty_ids[self._num_empty] = cell_id
+        self._empty_pos[cell_id] = self._num_empty
+        self._num_empty += 1
+
+    # topology
+
+    def _connections_of(self, cell_id: int) -> list[tuple[Coordinate, int]]:
+        topology = self._topology
+        center = np.array(self._coordinate_of(cell_id), dtype=np.int64)
+        ids, valid = topology.wrap(center + topology.offsets)
+        return [
+            (tuple(offset), neighbor)
+            for offset, neighbor, ok in zip(
+                topology.offsets.tolist(), ids.tolist(), valid.tolist()
+            )
+            if ok
+        ]
+
+    @property
+    def neighborhood_index(self) -> NeighborhoodIndex:
+        """Return the neighborhood index, shared by all grids with the same topology."""
+        return self._topology.neighborhood_index
+
+    # snapshots
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Return a compact state of the grid.
+
+        The topology is stored by key only and only the agent lists of occupied
+        cells are kept, so the state is mostly a handful of NumPy arrays.
+        """
+        state = super().__getstate__()
+        occupied = np.flatnonzero(self._occupancy).tolist()
+        state["_agents"] = (occupied, [self._agents[i] for i in occupied])
+        del state["_slots"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Set the state of the grid, connections are implicit so nothing is rebuild."""
+        agents = [None] * state["_num_cells"]
+        slots = [None] * state["_num_cells"]
+        for cell_id, cell_agents in zip(*state["_agents"]):
+            agents[cell_id] = cell_agents
+            slots[cell_id] = {agent: i for i, agent in enumerate(cell_agents)}
+        state["_agents"] = agents
+        state["_slots"] = slots
+        self.__dict__ = state
+
+
+class ArrayOrthogonalMooreGrid(ArrayGrid[T]):
+    """Array backed grid where cells are connected to their full Moore neighborhood.
+
+    This includes diagonal connections, so each cell has 8 neighbors in 2D and
+    (3^n)-1 in nD.
+    """
+
+    def _neighbor_offsets(self) -> list[tuple[int, ...]]:
+        return [
+            offset
+            for offset in product([-1, 0, 1], repeat=self._ndims)
+            if any(offset)
+        ]
+
+
+class ArrayOrthogonalVonNeumannGrid(ArrayGrid[T]):
+    """Array backed grid where cells are connected to their orthogonal neighbors.
+
+    Each cell has 4 neighbors in 2D and 2n in nD.
+    """
+
+    def _neighbor_offsets(self) -> list[tuple[int, ...]]:
+        offsets = []
+        for dim in range(self._ndims):
+            for delta in (-1, 1):
+                offset = [0] * self._ndims
+                offset[dim] = delta
+                offsets.append(tuple(offset))
+        return offsets
@@ -14,7 +14,7 @@ environmental conditions.
 
 from __future__ import annotations
 
-from functools import cache, cached_property
+from collections.abc import Collection, Iterator, Sequence
 from random import Random
 from typing import TYPE_CHECKING
 
@@ -24,28 +24,85 @@ from cell_collection import CellCollection
 if TYPE_CHECKING:
     from mesa.agent import Agent
 
+    from discrete_space import DiscreteSpace
+
 Coordinate = tuple[int, ...]
 
 
+class AgentsView(Sequence):
+    """A read-only view of the agents occupying a cell.
+
+    The view does not copy the agents of the cell, so it reflects later changes to
+    the cell. Use `snapshot` to get a list if the cell is modified while iterating,
+    for example when agents move or are removed inside the loop.
+    """
+
+    __slots__ = ["_agents"]
+
+    def __init__(self, agents: Sequence[CellAgent]) -> None:
+        """Initialise the view.
+
+        Args:
+            agents: the agent list of the cell
+
+        """
+        self._agents = agents
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._agents)
+
+    def __getitem__(self, index):  # noqa: D105
+        return self._agents[index]
+
+    def __iter__(self) -> Iterator[CellAgent]:  # noqa: D105
+        return iter(self._agents)
+
+    def __contains__(self, agent: object) -> bool:  # noqa: D105
+        return agent in self._agents
+
+    def __bool__(self) -> bool:  # noqa: D105
+        return bool(self._agents)
+
+    def __eq__(self, other: object) -> bool:  # noqa: D105
+        if isinstance(other, AgentsView):
+            other = other._agents
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self._agents) == list(other)
+
+    __hash__ = None
+
+    def __repr__(self):  # noqa
+        return f"AgentsView({list(self._agents)})"
+
+    def snapshot(self) -> list[CellAgent]:
+        """Return a list copy of the agents."""
+        return list(self._agents)
+
+
 class Cell:
     """The cell represents a position in a discrete space.
 
     Attributes:
         coordinate (Tuple[int, int]) : the position of the cell in the discrete space
-        agents (List[Agent]): the agents occupying the cell
+        agents (AgentsView): read-only view of the agents occupying the cell
         capacity (int): the maximum number of agents that can simultaneously occupy the cell
         random (Random): the random number generator
+        space (DiscreteSpace): the space the cell belongs to, set by the space
 
     """
 
     __slots__ = [
         "__dict__",
         "_agents",
+        "_slots",
+        "_type_counts",
         "capacity",
         "connections",
         "coordinate",
         "properties",
         "random",
+        "space",
     ]
 
     def __init__(
@@ -68,11 +125,16 @@ class Cell:
         self._agents: list[
             CellAgent
         ] = []  # TODO:: change to AgentSet or weakrefs? (neither is very performant, )
+        # position of each agent in _agents, so removal is a constant time swap-pop
+        self._slots: dict[CellAgent, int] = {}
+        # number of agents per concrete agent class, for constant time type queries
+        self._type_counts: dict[type, int] = {}
         self.capacity: int | None = capacity
         self.properties: dict[
             Coordinate, object
         ] = {}  # fixme still used by voronoi mesh
         self.random = random
+        self.space: DiscreteSpace | None = None
 
     def connect(self, other: Cell, key: Coordinate | None = None) -> None:
         """Connects this cell to another cell.
@@ -85,6 +147,7 @@ class Cell:
         if key is None:
             key = other.coordinate
         self.connections[key] = other
+        self._topology_changed()
 
     def disconnect(self, other: Cell) -> None:
         """Disconnects this cell from another cell.
@@ -96,6 +159,14 @@ class Cell:
         keys_to_remove = [k for k, v in self.connections.items() if v == other]
         for key in keys_to_remove:
             del self.connections[key]
+        self._topology_changed()
+
+    def _topology_changed(self) -> None:
+        """Invalidate the neighborhood index of the space, if it has been built."""
+        if self.space is not None:
+            index = self.space.__dict__.get("neighborhood_index")
+            if index is not None:
+                index.invalidate()
 
     def add_agent(self, agent: CellAgent) -> None:
         """Adds an agent to the cell.
@@ -112,37 +183,111 @@ class Cell:
                 "ERROR: Cell is full"
             )  # FIXME we need MESA errors or a proper error
 
+        self._slots[agent] = n
         self._agents.append(agent)
+        klass = type(agent)
+        self._type_counts[klass] = self._type_counts.get(klass, 0) + 1
+        if n == 0 and self.space is not None:
+            self.space._mark_occupied(self)
 
     def remove_agent(self, agent: CellAgent) -> None:
         """Removes an agent from the cell.
 
+        The last agent of the cell takes the place of the removed agent, so removal
+        takes constant time. The order of the remaining agents therefore only depends
+        on the sequence of additions and removals.
+
         Args:
             agent (CellAgent): agent to remove from this cell
 
         """
-        self._agents.remove(agent)
-        self.empty = self.is_empty
+        self._pop_agent(agent)
+        self.empty = not self._agents
+        if self.empty and self.space is not None:
+            self.space._mark_empty(self)
+
+    def _remove_agents(self, agents: Collection[CellAgent]) -> None:
+        """Remove several agents from the cell, updating the empties index once."""
+        for agent in agents:
+            self._pop_agent(agent)
+        self.empty = not self._agents
+        if self.empty and self.space is not None:
+            self.space._mark_empty(self)
+
+    def _pop_agent(self, agent: CellAgent) -> None:
+        try:
+            slot = self._slots.pop(agent)
+        except KeyError:
+            raise ValueError(f"{agent} is not in cell {self.coordinate}") from None
+        last = self._agents.pop()
+        if last is not agent:
+            self._agents[slot] = last
+            self._slots[last] = slot
+
+        klass = type(agent)
+        if self._type_counts[klass] == 1:
+            del self._type_counts[klass]
+        else:
+            self._type_counts[klass] -= 1
 
     @property
     def is_empty(self) -> bool:
         """Returns a bool of the contents of a cell."""
-        return len(self.agents) == 0
+        return not self._agents
 
     @property
     def is_full(self) -> bool:
         """Returns a bool of the contents of a cell."""
-        return len(self.agents) == self.capacity
+        return len(self._agents) == self.capacity
 
     @property
-    def agents(self) -> list[CellAgent]:
-        """Returns a list of the agents occupying the cell."""
-        return self._agents.copy()
+    def agents(self) -> AgentsView:
+        """Returns a read-only view of the agents occupying the cell."""
+        return AgentsView(self._agents)
+
+    def count_agents(self, agent_type: type | tuple[type, ...] | None = None) -> int:
+        """Returns the number of agents in the cell, optionally only those of a type.
+
+        Agents are counted with isinstance semantics, so subclasses of agent_type
+        are included. The count is maintained by add_agent and remove_agent and does
+        not scan the agents of the cell.
+
+        Args:
+            agent_type: agent class or tuple of agent classes to count
+
+        """
+        if agent_type is None:
+            return len(self._agents)
+        return sum(
+            n
+            for klass, n in self._type_counts.items()
+            if issubclass(klass, agent_type)
+        )
+
+    def has_agent_type(self, agent_type: type | tuple[type, ...]) -> bool:
+        """Returns whether the cell contains an agent of the given type.
+
+        Args:
+            agent_type: agent class or tuple of agent classes
+
+        """
+        return any(issubclass(klass, agent_type) for klass in self._type_counts)
+
+    def agents_of_type(self, agent_type: type | tuple[type, ...]) -> list[CellAgent]:
+        """Returns the agents of the given type occupying the cell.
+
+        Args:
+            agent_type: agent class or tuple of agent classes
+
+        """
+        if not self.has_agent_type(agent_type):
+            return []
+        return [agent for agent in self._agents if isinstance(agent, agent_type)]
 
     def __repr__(self):  # noqa
-        return f"Cell({self.coordinate}, {self.agents})"
+        return f"Cell({self.coordinate}, {self.agents.snapshot()})"
 
-    @cached_property
+    @property
     def neighborhood(self) -> CellCollection[Cell]:
         """Returns the direct neighborhood of the cell.
 
@@ -151,15 +296,14 @@ class Cell:
         """
         return self.get_neighborhood()
 
-    # FIXME: Revisit caching strategy on methods
-    @cache  # noqa: B019
     def get_neighborhood(
         self, radius: int = 1, include_center: bool = False
     ) -> CellCollection[Cell]:
         """Returns a list of all neighboring cells for the given radius.
 
         For getting the direct neighborhood (i.e., radius=1) you can also use
-        the `neighborhood` property.
+        the `neighborhood` property. Cells that belong to a space are looked up in
+        the neighborhood index of that space.
 
         Args:
             radius (int): the radius of the neighborhood
@@ -169,38 +313,34 @@ class Cell:
             a list of all neighboring cells
 
         """
+        if self.space is not None:
+            return self.space.neighborhood_index.get_neighborhood(
+                self, radius, include_center
+            )
         return CellCollection[Cell](
             self._neighborhood(radius=radius, include_center=include_center),
             random=self.random,
         )
 
-    # FIXME: Revisit caching strategy on methods
-    @cache  # noqa: B019
     def _neighborhood(
         self, radius: int = 1, include_center: bool = False
     ) -> dict[Cell, list[Agent]]:
-        # if radius == 0:
-        #     return {self: self.agents}
+        # breadth first search, only used for cells that do not belong to a space
         if radius < 1:
             raise ValueError("radius must be larger than one")
-        if radius == 1:
-            neighborhood = {
-                neighbor: neighbor._agents for neighbor in self.connections.values()
-            }
-            if not include_center:
-                return neighborhood
-            else:
-                neighborhood[self] = self._agents
-                return neighborhood
-        else:
-            neighborhood: dict[Cell, list[Agent]] = {}
-            for neighbor in self.connections.values():
-                neighborhood.update(
-                    neighbor._neighborhood(radius - 1, include_center=True)
-                )
-            if not include_center:
-                neighborhood.pop(self, None)
-            return neighborhood
+        neighborhood: dict[Cell, list[Agent]] = {self: self._agents}
+        frontier = [self]
+        for _ in range(radius):
+            next_frontier = []
+            for cell in frontier:
+                for neighbor in cell.connections.values():
+                    if neighbor not in neighborhood:
+                        neighborhood[neighbor] = neighbor._agents
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        if not include_center:
+            neighborhood.pop(self)
+        return neighborhood
 
     def __getstate__(self):
         """Return state of the Cell with connections set to empty."""
@@ -8,7 +8,10 @@ cells, supporting:
 - Group operations
 
 This is useful for implementing area effects, zones, or any operation that needs
-to work with multiple cells as a unit. The collection handles efficient iteration
+to work with multiple cells as a unit. Cell attributes such as occupancy, per type
+counts and property values can also be read as NumPy arrays (see `CellArrays`), so
+selections and weighted sampling can be expressed as array operations instead of
+a Python callback per cell. The collection handles efficient iteration
 and agent access across cells. The class is used throughout the cell space
 implementation to represent neighborhoods, selections, and other cell groupings.
 """
@@ -16,18 +19,84 @@ implementation to represent neighborhoods, selections, and other cell groupings.
 from __future__ import annotations
 
 import itertools
+import math
 import warnings
 from collections.abc import Callable, Iterable, Mapping
 from functools import cached_property
 from random import Random
-from typing import TYPE_CHECKING, Generic, TypeVar
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+import numpy as np
 
 if TYPE_CHECKING:
     from cell import Cell
     from cell_agent import CellAgent
+    from discrete_space import DiscreteSpace
 
 T = TypeVar("T", bound="Cell")
 
+Weights = np.ndarray | Iterable[float] | Callable[["CellArrays"], np.ndarray]
+
+
+class CellArrays:
+    """Array valued attributes of the cells in a collection.
+
+    All arrays are aligned with the iteration order of the collection. For
+    collections of an array-backed space they are read directly from the arrays of
+    the space, otherwise they are gathered from the cells once.
+
+    Attributes:
+        occupancy (np.ndarray): number of agents per cell
+        capacity (np.ndarray): capacity per cell, inf for unlimited cells
+
+    """
+
+    def __init__(self, collection: CellCollection) -> None:
+        """Initialize CellArrays.
+
+        Args:
+            collection: the collection to describe
+        """
+        self._collection = collection
+
+    @cached_property
+    def occupancy(self) -> np.ndarray:  # noqa: D102
+        collection = self._collection
+        if collection._ids is not None:
+            return collection._space._occupancy_of(collection._ids)
+        return np.fromiter(
+            map(len, collection._cells.values()), dtype=np.int64, count=len(collection)
+        )
+
+    @cached_property
+    def capacity(self) -> np.ndarray:  # noqa: D102
+        collection = self._collection
+        if collection._ids is not None:
+            return collection._space._capacity_of(collection._ids)
+        return np.array(
+            [np.inf if c.capacity is None else c.capacity for c in collection],
+            dtype=float,
+        )
+
+    def count(self, agent_type: type | tuple[type, ...]) -> np.ndarray:
+        """Number of agents of the given type (isinstance semantics) per cell."""
+        collection = self._collection
+        if collection._ids is not None:
+            return collection._space._count_of(collection._ids, agent_type)
+        return np.fromiter(
+            (cell.count_agents(agent_type) for cell in collection),
+            dtype=np.int64,
+            count=len(collection),
+        )
+
+    def property(self, name: str) -> np.ndarray:
+        """Values of a cell property per cell."""
+        collection = self._collection
+        if collection._ids is not None:
+            return collection._space._property_of(collection._ids, name)
+        return np.array([cell.properties[name] for cell in collection])
+
+
 
 class CellCollection(Generic[T]):
     """An immutable collection of cells.
@@ -42,9 +111,27 @@ class CellCollection(Generic[T]):
         passing a random number generator. In most cases, this will be the seeded random number
         generator in the model. So, you would do `random=self.random` in a `Model` or `Agent` instance.
 
+        Collections created by array-backed spaces (see `array_grid.ArrayGrid`) hold a sequence
+        of flat cell ids instead of a cell-to-agents dict. Cells are then created on demand while
+        iterating, so large collections such as `all_cells` do not build one object per cell.
+        Selecting from such a collection again gives a collection of ids, and agents are read
+        from the space, so empty cells never get an agent list.
+
+        Lazy collections (see `lazy`) only record filters and `at_most` limits on top of another
+        collection. The filters are evaluated each time the collection is iterated, so a lazy
+        collection reflects the current state of its cells. Operations that need random access,
+        such as `len`, random selection or the array API, evaluate the filters first; call
+        `materialize` to evaluate them once and reuse the result.
+
 
     """
 
+    _space: DiscreteSpace | None = None
+    _ids = None
+    # lazy collections: the collection they filter and their (filter, at_most) stages
+    _base: CellCollection | None = None
+    _stages: tuple = ()
+
     def __init__(
         self,
         cells: Mapping[T, list[CellAgent]] | Iterable[T],
@@ -75,71 +162,405 @@ class CellCollection(Generic[T]):
             random = Random()
         self.random = random
 
+    @classmethod
+    def _from_ids(
+        cls, space: DiscreteSpace, ids, random: Random | None = None
+    ) -> CellCollection[T]:
+        """Create a collection over flat cell ids of an array-backed space.
+
+        Args:
+            space: the space that owns the cells
+            ids: sequence of flat cell ids (typically a NumPy integer array)
+            random: a seeded random number generator, defaults to the one of the space
+
+        """
+        collection = cls.__new__(cls)
+        collection._space = space
+        collection._ids = ids
+        collection._capacity = space.capacity
+        collection.random = space.random if random is None else random
+        return collection
+
+    def lazy(self) -> CellCollection[T]:
+        """Return a lazy view of this collection.
+
+        Calling `select` on a lazy collection composes the filter and `at_most` limit
+        with the existing ones instead of building a new collection.
+        """
+        if self._base is not None:
+            return self
+        collection = self.__class__.__new__(self.__class__)
+        collection._base = self
+        collection._space = self._space
+        collection._capacity = self._capacity
+        collection.random = self.random
+        return collection
+
+    @property
+    def is_lazy(self) -> bool:
+        """Whether this collection evaluates its filters on iteration."""
+        return self._base is not None
+
+    def materialize(self) -> CellCollection[T]:
+        """Evaluate the filters of a lazy collection and return a regular collection.
+
+        Collections over an array-backed space materialize to an array of cell ids, so
+        no dict of cells is built. Non lazy collections return themselves.
+        """
+        base = self._base
+        if base is None:
+            return self
+        if not self._stages:
+            return base
+        if base._ids is not None:
+            ids = np.fromiter(self._filtered_ids(), dtype=base._ids.dtype)
+            return CellCollection._from_ids(base._space, ids, random=self.random)
+        return CellCollection(self._filtered(iter(base)), random=self.random)
+
+    def _filtered(self, cells: Iterable[T]) -> Iterable[T]:
+        for filter_func, at_most in self._stages:
+            cells = self._apply_stage(cells, filter_func, at_most)
+        return cells
+
+    @staticmethod
+    def _apply_stage(cells, filter_func, at_most):
+        count = 0
+        for cell in cells:
+            if count >= at_most:
+                break
+            if not filter_func or filter_func(cell):
+                yield cell
+                count += 1
+
+    def _filtered_ids(self) -> Iterable[int]:
+        space = self._base._space
+        ids = self._base._ids.tolist()
+        # keep track of the id of each cell that passes the filters
+        pairs = ((cell_id, space._cell_at(cell_id)) for cell_id in ids)
+        for filter_func, at_most in self._stages:
+            pairs = self._apply_stage(
+                pairs, filter_func and (lambda pair, f=filter_func: f(pair[1])), at_most
+            )
+        return (cell_id for cell_id, _ in pairs)
+
+    @cached_property
+    def _cells(self) -> dict[T, list[CellAgent]]:
+        # only reached for id backed collections, dict backed ones set this in __init__
+        return {cell: cell._agents for cell in self}
+
     def __iter__(self):  # noqa
+        if self._base is not None:
+            return iter(self._filtered(self._base))
+        if self._ids is not None:
+            return map(self._space._cell_at, self._ids.tolist())
         return iter(self._cells)
 
     def __getitem__(self, key: T) -> Iterable[CellAgent]:  # noqa
+        if self._base is not None:
+            return self.materialize()[key]
+        if self._ids is not None:
+            if getattr(key, "space", None) is not self._space or key._id not in self._id_set:
+                raise KeyError(key)
+            return self._space._agents_at(key._id)
         return self._cells[key]
 
+    @cached_property
+    def _id_set(self) -> frozenset[int]:
+        return frozenset(self._ids.tolist())
+
     # @cached_property
     def __len__(self) -> int:  # noqa
+        if self._base is not None:
+            if not self._stages:
+                return len(self._base)
+            return sum(1 for _ in self)
+        if self._ids is not None:
+            return len(self._ids)
         return len(self._cells)
 
     def __repr__(self):  # noqa
+        if self._base is not None:
+            return f"CellCollection(lazy, {len(self._stages)} filters)"
+        if self._ids is not None:
+            space = self._space
+            cells = {
+                space._cell_at(cell_id): list(space._agents_at(cell_id))
+                for cell_id in self._ids.tolist()
+            }
+            return f"CellCollection({cells})"
         return f"CellCollection({self._cells})"
 
-    @cached_property
+    @property
     def cells(self) -> list[T]:  # noqa
-        return list(self._cells.keys())
+        if self._base is not None:
+            return list(self)
+        return self._cell_cache
+
+    @cached_property
+    def _cell_cache(self) -> list[T]:
+        return list(self)
 
     @property
     def agents(self) -> Iterable[CellAgent]:  # noqa
+        if self._base is not None:
+            if not self._stages:
+                return self._base.agents
+            return itertools.chain.from_iterable(cell.agents for cell in self)
+        if self._ids is not None:
+            return itertools.chain.from_iterable(
+                map(self._space._agents_at, self._ids.tolist())
+            )
         return itertools.chain.from_iterable(self._cells.values())
 
     def select_random_cell(self) -> T:
         """Select a random cell."""
+        if self._base is not None:
+            return self.materialize().select_random_cell()
+        if self._ids is not None:
+            return self._space._cell_at(
+                int(self._ids[self.random.randrange(len(self._ids))])
+            )
         return self.random.choice(self.cells)
 
+    @property
+    def arrays(self) -> CellArrays:
+        """Array valued attributes of the cells, aligned with the collection order."""
+        return CellArrays(self.materialize())
+
+    def _numpy_rng(self) -> np.random.Generator:
+        # seeded from self.random, so results stay reproducible for a seeded model
+        return np.random.default_rng(self.random.getrandbits(64))
+
+    def _cell_list(self) -> list[T]:
+        if self._ids is not None:
+            return self.cells
+        return list(self._cells)
+
+    def _agents_of(self, index: int) -> Iterable[CellAgent]:
+        if self._ids is not None:
+            return self._space._agents_at(int(self._ids[index]))
+        return self._cells[self.cells[index]]
+
     def select_random_agent(self) -> CellAgent:
         """Select a random agent.
 
+        The agent is drawn uniformly from all agents in the collection without
+        building a list of them.
+
         Returns:
             CellAgent instance
 
 
         """
-        return self.random.choice(list(self.agents))
+        if self._base is not None:
+            return self.materialize().select_random_agent()
+        cumulative = np.cumsum(self.arrays.occupancy)
+        total = int(cumulative[-1]) if len(cumulative) else 0
+        if total == 0:
+            raise IndexError("Cannot choose from an empty sequence")
+        position = self.random.randrange(total)
+        index = int(np.searchsorted(cumulative, position, side="right"))
+        offset = position - (int(cumulative[index - 1]) if index else 0)
+        return self._agents_of(index)[offset]
+
+    def _resolve_weights(self, weights: Weights | None) -> np.ndarray | None:
+        if weights is None:
+            return None
+        if callable(weights):
+            weights = weights(self.arrays)
+        weights = np.asarray(weights, dtype=float)
+        if weights.shape != (len(self),):
+            raise ValueError("weights must have one entry per cell")
+        return weights / weights.sum()
+
+    def select_where(
+        self,
+        predicate: Callable[[CellArrays], np.ndarray],
+        at_most: int | float = float("inf"),
+    ) -> CellCollection[T]:
+        """Select cells with a vectorized predicate.
+
+        Args:
+            predicate: function that takes the `CellArrays` of this collection and
+                returns a boolean mask with one entry per cell, for example
+                ``lambda a: (a.occupancy == 0) & (a.property("heat") > 1)``
+            at_most: The maximum amount of cells to select. Defaults to infinity.
+              - If an integer, at most the first number of matching cells is selected.
+              - If a float between 0 and 1, at most that fraction of original number of cells
+
+        Returns:
+            CellCollection
+
+        """
+        if self._base is not None:
+            return self.materialize().select_where(predicate, at_most)
+        if at_most <= 1.0 and isinstance(at_most, float):
+            at_most = int(len(self) * at_most)  # Note that it rounds down (floor)
+        indices = np.flatnonzero(np.asarray(predicate(self.arrays), dtype=bool))
+        if at_most < len(indices):
+            indices = indices[: int(at_most)]
+
+        if self._ids is not None:
+            return CellCollection._from_ids(
+                self._space, self._ids[indices], random=self.random
+            )
+        cells = self._cell_list()
+        return CellCollection(
+            {cells[i]: self._cells[cells[i]] for i in indices.tolist()},
+            random=self.random,
+        )
+
+    def sample_cells(
+        self, k: int, weights: Weights | None = None, replace: bool = False
+    ) -> list[T]:
+        """Sample k cells in one call.
+
+        Args:
+            k: number of cells to draw
+            weights: optional sampling weights, either one value per cell or a function
+                that computes them from the `CellArrays` of this collection
+            replace: whether a cell can be drawn more than once
+
+        Returns:
+            list of cells
+
+        """
+        if self._base is not None:
+            return self.materialize().sample_cells(k, weights, replace)
+        p = self._resolve_weights(weights)
+        if p is None and not replace:
+            indices = self.random.sample(range(len(self)), k)
+        else:
+            indices = self._numpy_rng().choice(len(self), size=k, replace=replace, p=p)
+            indices = indices.tolist()
+        if self._ids is not None:
+            ids = self._ids
+            return [self._space._cell_at(int(ids[i])) for i in indices]
+        cells = self._cell_list()
+        return [cells[i] for i in indices]
+
+    def sample_agents(
+        self,
+        k: int,
+        weights: Iterable[float] | Callable[[Any], float] | None = None,
+        replace: bool = False,
+    ) -> list[CellAgent]:
+        """Sample k agents from the cells of this collection in one call.
+
+        Unweighted samples are drawn from flat agent positions, so the agents
+        themselves are only touched once they have been drawn.
+
+        Args:
+            k: number of agents to draw
+            weights: optional sampling weights, either one value per agent (in the
+                order of `agents`) or a function that maps an agent to its weight
+            replace: whether an agent can be drawn more than once
+
+        Returns:
+            list of agents
+
+        """
+        if self._base is not None:
+            return self.materialize().sample_agents(k, weights, replace)
+        if weights is not None:
+            agents = list(self.agents)
+            if callable(weights):
+                weights = [weights(agent) for agent in agents]
+            p = np.asarray(weights, dtype=float)
+            p = p / p.sum()
+            indices = self._numpy_rng().choice(len(agents), size=k, replace=replace, p=p)
+            return [agents[i] for i in indices.tolist()]
+
+        cumulative = np.cumsum(self.arrays.occupancy)
+        total = int(cumulative[-1]) if len(cumulative) else 0
+        if replace:
+            positions = self._numpy_rng().integers(0, total, size=k)
+        else:
+            positions = np.array(self.random.sample(range(total), k), dtype=np.int64)
+        cell_indices = np.searchsorted(cumulative, positions, side="right")
+        starts = np.concatenate(([0], cumulative))[cell_indices]
+        return [
+            self._agents_of(cell_index)[offset]
+            for cell_index, offset in zip(
+                cell_indices.tolist(), (positions - starts).tolist()
+            )
+        ]
 
     def select(
         self,
         filter_func: Callable[[T], bool] | None = None,
         at_most: int | float = float("inf"),
+        agent_type: type | tuple[type, ...] | None = None,
     ):
         """Select cells based on filter function.
 
+        See `select_where` for a vectorized alternative to filter_func.
+
         Args:
             filter_func: filter function
             at_most: The maximum amount of cells to select. Defaults to infinity.
               - If an integer, at most the first number of matching cells is selected.
               - If a float between 0 and 1, at most that fraction of original number of cells
+            agent_type: only select cells that contain at least one agent of this type
+              (or tuple of types). Uses the per type counts of the cells, so it does
+              not iterate over the agents of each cell.
 
         Returns:
-            CellCollection
+            CellCollection, lazy if this collection is lazy
 
         """
-        if filter_func is None and at_most == float("inf"):
+        if filter_func is None and agent_type is None and at_most == float("inf"):
             return self
 
         if at_most <= 1.0 and isinstance(at_most, float):
             at_most = int(len(self) * at_most)  # Note that it rounds down (floor)
 
+        if self._base is not None:
+            if agent_type is not None:
+                type_filter = filter_func
+
+                def filter_func(cell):
+                    return cell.has_agent_type(agent_type) and (
+                        not type_filter or type_filter(cell)
+                    )
+
+            collection = self.__class__.__new__(self.__class__)
+            collection.__dict__.update(
+                _base=self._base,
+                _stages=(*self._stages, (filter_func, at_most)),
+                _space=self._space,
+                _capacity=self._capacity,
+                random=self.random,
+            )
+            return collection
+
+        if self._ids is not None:
+            return self._select_ids(filter_func, at_most, agent_type)
+
         def cell_generator(filter_func, at_most):
             count = 0
             for cell in self:
                 if count >= at_most:
                     break
+                if agent_type is not None and not cell.has_agent_type(agent_type):
+                    continue
                 if not filter_func or filter_func(cell):
                     yield cell
                     count += 1
 
         return CellCollection(cell_generator(filter_func, at_most), random=self.random)
+
+    def _select_ids(self, filter_func, at_most, agent_type) -> CellCollection[T]:
+        # filtered id backed collections stay id backed, so no dict of cells is built
+        space, ids = self._space, self._ids
+        if agent_type is not None:
+            ids = ids[space._count_of(ids, agent_type) > 0]
+        limit = None if at_most == float("inf") else max(0, math.ceil(at_most))
+        if filter_func is not None:
+            selected = (
+                cell_id for cell_id in ids.tolist() if filter_func(space._cell_at(cell_id))
+            )
+            ids = np.fromiter(itertools.islice(selected, limit), dtype=ids.dtype)
+        elif limit is not None:
+            ids = ids[:limit]
+        return CellCollection._from_ids(space, ids, random=self.random)
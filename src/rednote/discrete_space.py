@@ -16,17 +16,50 @@ inherit from this class.
 from __future__ import annotations
 
 import warnings
+from collections import defaultdict
+from collections.abc import Sequence
 from functools import cached_property
 from random import Random
-from typing import Generic, TypeVar
+from typing import TYPE_CHECKING, Generic, TypeVar
 
+import numpy as np
 from mesa.agent import AgentSet
 from cell import Cell
+from cell_agent import FixedCell
 from cell_collection import CellCollection
+from neighborhood import NeighborhoodIndex, NeighborhoodTable
+
+if TYPE_CHECKING:
+    from cell_agent import CellAgent
 
 T = TypeVar("T", bound=Cell)
 
 
+class _CellRegistry(dict):
+    """The cells of a space by coordinate, every cell added is registered with the space."""
+
+    def __init__(self, space: DiscreteSpace, cells=()) -> None:
+        super().__init__()
+        self._space = space
+        self.update(cells)
+
+    def __setitem__(self, coordinate, cell) -> None:
+        cell.space = self._space
+        super().__setitem__(coordinate, cell)
+
+    def update(self, cells=(), **kwargs) -> None:  # noqa: D102
+        for coordinate, cell in dict(cells, **kwargs).items():
+            self[coordinate] = cell
+
+    def setdefault(self, coordinate, cell=None):  # noqa: D102
+        if coordinate not in self:
+            self[coordinate] = cell
+        return self[coordinate]
+
+    def __reduce__(self):  # noqa: D105
+        return _CellRegistry, (self._space, dict(self))
+
+
 class DiscreteSpace(Generic[T]):
     """Base class for all discrete spaces.
 
@@ -36,6 +69,7 @@ class DiscreteSpace(Generic[T]):
         random (Random): The random number generator
         cell_klass (Type) : the type of cell class
         empties (CellCollection) : collection of all cells that are empty
+        neighborhood_index (NeighborhoodIndex) : precomputed neighborhoods of all cells
         property_layers (dict[str, PropertyLayer]): the property layers of the discrete space
 
     Notes:
@@ -60,7 +94,7 @@ class DiscreteSpace(Generic[T]):
         """
         super().__init__()
         self.capacity = capacity
-        self._cells: dict[tuple[int, ...], T] = {}
+        self._cells = {}
         if random is None:
             warnings.warn(
                 "Random number generator not specified, this can make models non-reproducible. Please pass a random number generator explicitly",
@@ -71,26 +105,156 @@ class DiscreteSpace(Generic[T]):
         self.random = random
         self.cell_klass = cell_klass
 
-        self._empties: dict[tuple[int, ...], None] = {}
-
-    @property
-    def cutoff_empties(self):  # noqa
-        return 7.953 * len(self._cells) ** 0.384
+        # swap-remove list of empty cells and the position of each cell in it,
+        # built on first use and then kept up to date by Cell.add_agent/remove_agent
+        self._empties: list[T] | None = None
+        self._empties_pos: dict[T, int] = {}
 
     @property
     def agents(self) -> AgentSet:
         """Return an AgentSet with the agents in the space."""
         return AgentSet(self.all_cells.agents, random=self.random)
 
+    @property
+    def _cells(self) -> dict[tuple[int, ...], T]:
+        return self.__dict__["_cells"]
+
+    @_cells.setter
+    def _cells(self, cells: dict[tuple[int, ...], T]) -> None:
+        # subclasses fill or replace the dict of cells directly, registering the cells
+        # as they are added means cell.space is set before any neighborhood lookup
+        self.__dict__["_cells"] = _CellRegistry(self, cells)
+
     def _connect_cells(self): ...
     def _connect_single_cell(self, cell: T): ...
 
+    def add_cell(self, cell: T):
+        """Add a cell to the space.
+
+        Args:
+            cell: cell to add
+
+        """
+        self._cells[cell.coordinate] = cell
+        self._reset_cell_ids()
+
+    def remove_cell(self, cell: T):
+        """Remove a cell from the space.
+
+        Args:
+            cell: cell to remove
+
+        """
+        neighbors = list(cell.connections.values())
+        self._cells.pop(cell.coordinate)
+        self._reset_cell_ids()
+        cell.space = None
+
+        for neighbor in neighbors:
+            neighbor.disconnect(cell)
+            cell.disconnect(neighbor)
+
+    def _reset_cell_ids(self):
+        for attr in ("_cell_list", "_cell_ids", "neighborhood_index"):
+            self.__dict__.pop(attr, None)
+        self._empties = None
+        self._empties_pos = {}
+
+    @cached_property
+    def _cell_list(self) -> list[T]:
+        """Cells in id order, the flat id of a cell is its position in this list."""
+        return list(self._cells.values())
+
+    @cached_property
+    def _cell_ids(self) -> dict[T, int]:
+        return {cell: i for i, cell in enumerate(self._cell_list)}
+
+    def _id_of_cell(self, cell: T) -> int:
+        return self._cell_ids[cell]
+
+    def _cell_at(self, cell_id: int) -> T:
+        return self._cell_list[cell_id]
+
+    def _agents_at(self, cell_id: int) -> Sequence[CellAgent]:
+        return self._cell_list[cell_id]._agents
+
+    def _occupancy_of(self, ids: np.ndarray) -> np.ndarray:
+        cells = self._cell_list
+        return np.fromiter(
+            (len(cells[i]._agents) for i in ids.tolist()), dtype=np.int64, count=len(ids)
+        )
+
+    def _capacity_of(self, ids: np.ndarray) -> np.ndarray:
+        cells = self._cell_list
+        return np.array(
+            [
+                np.inf if cells[i].capacity is None else cells[i].capacity
+                for i in ids.tolist()
+            ],
+            dtype=float,
+        )
+
+    def _count_of(
+        self, ids: np.ndarray, agent_type: type | tuple[type, ...]
+    ) -> np.ndarray:
+        cells = self._cell_list
+        return np.fromiter(
+            (cells[i].count_agents(agent_type) for i in ids.tolist()),
+            dtype=np.int64,
+            count=len(ids),
+        )
+
+    def _property_of(self, ids: np.ndarray, name: str) -> np.ndarray:
+        cells = self._cell_list
+        return np.array([cells[i].properties[name] for i in ids.tolist()])
+
     @cached_property
-    def all_cells(self):
-        """Return all cells in space."""
-        return CellCollection(
-            {cell: cell._agents for cell in self._cells.values()}, random=self.random
+    def neighborhood_index(self) -> NeighborhoodIndex:
+        """Return the neighborhood index of the space."""
+        return NeighborhoodIndex(self)
+
+    def _build_neighborhood_table(self, radius: int) -> NeighborhoodTable:
+        """Build the neighborhoods of all cells by following connections.
+
+        Cells within radius steps are found with sparse boolean matrix products of
+        the adjacency matrix, so the table is built without visiting cells in Python
+        more than once.
+        """
+        from scipy import sparse
+
+        cell_ids = self._cell_ids
+        rows, cols = [], []
+        for i, cell in enumerate(self._cell_list):
+            for neighbor in cell.connections.values():
+                rows.append(i)
+                cols.append(cell_ids[neighbor])
+
+        n = len(cell_ids)
+        adjacency = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, cols)), shape=(n, n)
         )
+        reachable = adjacency
+        for _ in range(radius - 1):
+            reachable = (reachable + reachable @ adjacency).astype(bool)
+        reachable = reachable.tolil()
+        reachable.setdiag(False)
+        reachable = reachable.tocsr()
+        reachable.eliminate_zeros()
+        reachable.sort_indices()
+        return NeighborhoodTable(
+            radius, reachable.indptr.astype(np.int64), reachable.indices
+        )
+
+    @property
+    def all_cells(self) -> CellCollection[T]:
+        """Return a lazy collection of all cells in space.
+
+        The collection is backed by cell ids and does not copy the cells of the space.
+        Selections on it are lazy as well, see `CellCollection.lazy`.
+        """
+        return CellCollection._from_ids(
+            self, np.arange(len(self._cell_list)), random=self.random
+        ).lazy()
 
     def __iter__(self):  # noqa
         return iter(self._cells.values())
@@ -98,14 +262,146 @@ class DiscreteSpace(Generic[T]):
     def __getitem__(self, key: tuple[int, ...]) -> T:  # noqa: D105
         return self._cells[key]
 
+    def _empties_index(self) -> list[T]:
+        if self._empties is None:
+            self._empties = [cell for cell in self._cell_list if cell.is_empty]
+            self._empties_pos = {cell: i for i, cell in enumerate(self._empties)}
+        return self._empties
+
+    def _mark_occupied(self, cell: T) -> None:
+        """Remove a cell that received its first agent from the empties index."""
+        if self._empties is None:
+            return
+        pos = self._empties_pos.pop(cell)
+        last = self._empties.pop()
+        if last is not cell:
+            self._empties[pos] = last
+            self._empties_pos[last] = pos
+
+    def _mark_empty(self, cell: T) -> None:
+        """Add a cell that lost its last agent to the empties index."""
+        if self._empties is None:
+            return
+        self._empties_pos[cell] = len(self._empties)
+        self._empties.append(cell)
+
     @property
     def empties(self) -> CellCollection[T]:
         """Return all empty in spaces."""
-        return self.all_cells.select(lambda cell: cell.is_empty)
+        return CellCollection(list(self._empties_index()), random=self.random)
+
+    @property
+    def empty_count(self) -> int:
+        """Return the number of empty cells."""
+        return len(self._empties_index())
+
+    def move_many(
+        self,
+        agents: Sequence[CellAgent],
+        target_cells: Sequence[T | None],
+        policy: str = "first",
+    ) -> list[bool]:
+        """Move many agents at once.
+
+        All moves are treated as simultaneous: agents leaving a cell free its
+        capacity for agents entering it in the same call. If more agents want to
+        enter a cell than it has room for, the conflict is resolved by the policy:
+        - "first": agents earlier in `agents` win
+        - "random": winners are drawn with the random number generator of the space
+        - "reject": none of the competing agents move
+
+        Agents that cannot move stay in their current cell, as do agents whose target
+        is their current cell. Agents leaving the same cell are removed from it in a
+        single pass over its agent list.
+
+        Args:
+            agents: the agents to move
+            target_cells: the cell for each agent, None removes the agent from the space
+            policy: conflict resolution policy, one of "first", "random" or "reject"
+
+        Returns:
+            for each agent whether it moved
+
+        """
+        if policy not in ("first", "random", "reject"):
+            raise ValueError(f"Unknown conflict resolution policy: {policy}")
+        if len(agents) != len(target_cells):
+            raise ValueError("agents and target_cells must have the same length")
+
+        sources = [agent.cell for agent in agents]
+        for agent, source, target in zip(agents, sources, target_cells):
+            if isinstance(agent, FixedCell) and target != source:
+                raise ValueError("Cannot move agent in FixedCell")
+        moving = [
+            i for i, (source, target) in enumerate(zip(sources, target_cells))
+            if target != source
+        ]
+        accepted = dict.fromkeys(moving, True)
+
+        # rejecting an agent keeps its source occupied, which can in turn
+        # leave no room for agents entering that cell, so repeat until stable
+        changed = True
+        while changed:
+            changed = False
+            leaving = defaultdict(int)
+            entering = defaultdict(list)
+            for i in moving:
+                if accepted[i]:
+                    if sources[i] is not None:
+                        leaving[sources[i]] += 1
+                    if target_cells[i] is not None:
+                        entering[target_cells[i]].append(i)
+
+            for target, contenders in entering.items():
+                capacity = target.capacity or float("inf")
+                free = capacity - len(target.agents) + leaving[target]
+                if len(contenders) <= free:
+                    continue
+                free = max(int(free), 0)
+                if policy == "reject":
+                    rejected = contenders
+                elif policy == "random":
+                    rejected = self.random.sample(contenders, len(contenders) - free)
+                else:
+                    rejected = contenders[free:]
+                for i in rejected:
+                    accepted[i] = False
+                changed = True
+
+        leaving_agents = defaultdict(list)
+        for i in moving:
+            if accepted[i] and sources[i] is not None:
+                leaving_agents[sources[i]].append(agents[i])
+        for source, leavers in leaving_agents.items():
+            source._remove_agents(leavers)
+        for i in moving:
+            if accepted[i]:
+                agent, target = agents[i], target_cells[i]
+                agent._mesa_cell = target
+                if target is not None:
+                    target.add_agent(agent)
+
+        return [accepted.get(i, False) for i in range(len(agents))]
 
     def select_random_empty_cell(self) -> T:
         """Select random empty cell."""
-        return self.random.choice(list(self.empties))
+        empties = self._empties_index()
+        if not empties:
+            raise IndexError("Cannot choose from an empty sequence")
+        return empties[self.random.randrange(len(empties))]
+
+    def __getstate__(self):
+        """Return the state of the discrete space without its derived indices.
+
+        Cell ids, the empties index and the neighborhood tables are rebuilt lazily
+        after loading, so they are not part of pickles or deep copies.
+        """
+        state = self.__dict__.copy()
+        for attr in ("_cell_list", "_cell_ids", "neighborhood_index"):
+            state.pop(attr, None)
+        state["_empties"] = None
+        state["_empties_pos"] = {}
+        return state
 
     def __setstate__(self, state):
         """Set the state of the discrete space and rebuild the connections."""
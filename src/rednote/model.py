@@ -28,8 +28,8 @@ class SocialMediaModel(Model):
 
     def step(self):
         super().step()
-        # 平台检测机制
-        if self.schedule.steps % self.detection_interval == 0:
+        # 平台检测机制，Mesa 3 的模型没有 schedule，步数由 Model 自己维护
+        if self.steps % self.detection_interval == 0:
             self.detect_suspicious_actors()
         # 动态调整广告影响范围
         for ad in self.ads:
@@ -0,0 +1,201 @@
+"""Precomputed neighborhood tables for discrete spaces.
+
+Instead of walking `Cell.connections` recursively for every (cell, radius) pair,
+a space builds all neighborhoods of a given radius at once and stores them in
+compressed sparse row (CSR) form:
+- `indptr[i]:indptr[i + 1]` delimits the neighborhood of the cell with id `i`
+- `indices` holds the flat cell ids of all neighborhoods back to back
+
+Tables are built in vectorized form by the space (see
+`DiscreteSpace._build_neighborhood_table`) the first time a radius is requested.
+Neighborhood queries then return `CellCollection` views over a slice of the table,
+so no per-cell dicts are created and nothing is kept alive through method caches.
+
+The tables of a space are kept in a bounded LRU cache. Least recently used radii
+are evicted once the tables exceed a memory budget, and all tables are dropped
+when cells are connected or disconnected.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+from cell_collection import CellCollection
+
+if TYPE_CHECKING:
+    from array_grid import GridTopology
+    from cell import Cell
+    from discrete_space import DiscreteSpace
+
+
+class NeighborhoodTable:
+    """All neighborhoods of a space for a single radius, stored in CSR form.
+
+    The center cell is never part of a stored neighborhood.
+
+    Attributes:
+        radius (int): the radius of the neighborhoods
+        indptr (np.ndarray): row offsets, the neighborhood of cell i is indices[indptr[i]:indptr[i+1]]
+        indices (np.ndarray): flat cell ids of all neighborhoods
+
+    """
+
+    __slots__ = ["indices", "indptr", "radius"]
+
+    def __init__(self, radius: int, indptr: np.ndarray, indices: np.ndarray) -> None:
+        """Initialize a NeighborhoodTable.
+
+        Args:
+            radius: the radius of the neighborhoods
+            indptr: row offsets of length number of cells + 1
+            indices: flat cell ids of all neighborhoods
+        """
+        self.radius = radius
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_rows(
+        cls, radius: int, counts: list[np.ndarray], rows: list[np.ndarray]
+    ) -> NeighborhoodTable:
+        """Assemble a table from chunks of row sizes and concatenated rows."""
+        indptr = np.zeros(sum(len(c) for c in counts) + 1, dtype=np.int64)
+        np.cumsum(np.concatenate(counts), out=indptr[1:])
+        indices = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        dtype = np.int32 if len(indptr) <= np.iinfo(np.int32).max else np.int64
+        return cls(radius, indptr, indices.astype(dtype, copy=False))
+
+    def __getitem__(self, cell_id: int) -> np.ndarray:
+        """Return the neighborhood of a cell as a view on the table."""
+        return self.indices[self.indptr[cell_id] : self.indptr[cell_id + 1]]
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.indptr) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the table in bytes."""
+        return self.indptr.nbytes + self.indices.nbytes
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a NeighborhoodIndex, in the spirit of functools.lru_cache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    currsize: int
+    nbytes: int
+    max_bytes: int
+
+
+class NeighborhoodIndex:
+    """Space level index of neighborhoods, one `NeighborhoodTable` per radius.
+
+    Attributes:
+        space (DiscreteSpace | GridTopology): the object the tables are built from, the
+            space itself or, for array grids, the topology shared by grids of the same shape
+        max_bytes (int): memory budget for the cached tables. The most recently
+            used table is always kept, even if it alone exceeds the budget.
+
+    """
+
+    max_bytes: int = 512 * 2**20
+
+    def __init__(
+        self, space: DiscreteSpace | GridTopology, max_bytes: int | None = None
+    ) -> None:
+        """Initialize a NeighborhoodIndex.
+
+        Args:
+            space: the space or grid topology to index
+            max_bytes: memory budget for the cached tables, defaults to 512 MiB
+        """
+        self.space = space
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        self._tables: OrderedDict[int, NeighborhoodTable] = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def table(self, radius: int) -> NeighborhoodTable:
+        """Return the table for the given radius, building it if needed."""
+        try:
+            table = self._tables[radius]
+        except KeyError:
+            if radius < 1:
+                raise ValueError("radius must be at least one") from None
+        else:
+            self.hits += 1
+            self._tables.move_to_end(radius)
+            return table
+
+        self.misses += 1
+        table = self.space._build_neighborhood_table(radius)
+        self._tables[radius] = table
+        self._nbytes += table.nbytes
+        while self._nbytes > self.max_bytes and len(self._tables) > 1:
+            _, evicted = self._tables.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+            self.evictions += 1
+        return table
+
+    def invalidate(self) -> None:
+        """Drop all tables, e.g. because the connections between cells changed."""
+        if self._tables:
+            self.invalidations += 1
+        self._tables.clear()
+        self._nbytes = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Return hit, miss and memory statistics of the cached tables."""
+        return CacheInfo(
+            self.hits,
+            self.misses,
+            self.evictions,
+            self.invalidations,
+            len(self._tables),
+            self._nbytes,
+            self.max_bytes,
+        )
+
+    def neighborhood_ids(
+        self, cell_id: int, radius: int = 1, include_center: bool = False
+    ) -> np.ndarray:
+        """Return the flat ids of the neighborhood of a cell.
+
+        Args:
+            cell_id: flat id of the center cell
+            radius: the radius of the neighborhood
+            include_center: include the center of the neighborhood
+
+        """
+        ids = self.table(radius)[cell_id]
+        if include_center:
+            ids = np.append(ids, cell_id)
+        return ids
+
+    def get_neighborhood(
+        self, cell: Cell, radius: int = 1, include_center: bool = False
+    ) -> CellCollection:
+        """Return the neighborhood of a cell as a collection view.
+
+        Args:
+            cell: the center cell
+            radius: the radius of the neighborhood
+            include_center: include the center of the neighborhood
+
+        """
+        space = cell.space
+        return CellCollection._from_ids(
+            space,
+            self.neighborhood_ids(space._id_of_cell(cell), radius, include_center),
+            random=space.random,
+        )
@@ -0,0 +1,145 @@
+import copy
+import pickle
+import random
+
+import numpy as np
+import pytest
+from mesa import Model
+
+from array_grid import ArrayOrthogonalMooreGrid
+from cell_agent import CellAgent
+from test_discrete_space import Ring
+
+
+class Walker(CellAgent):
+    pass
+
+
+def make_space(kind, seed=0):
+    if kind == "cells":
+        space = Ring(50, seed=seed)
+    else:
+        space = ArrayOrthogonalMooreGrid((5, 10), random=random.Random(seed))
+    return space, list(space.all_cells)
+
+
+@pytest.fixture(params=["cells", "array"])
+def kind(request):
+    return request.param
+
+
+def empty_cells(cells):
+    return {cell for cell in cells if cell.is_empty}
+
+
+def test_empties_index_follows_agents(kind):
+    space, cells = make_space(kind)
+    model = Model(seed=0)
+    rng = random.Random(0)
+    agents = []
+    assert space.empty_count == len(cells)
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.4 or not agents:
+            agent = Walker(model)
+            agent.cell = rng.choice(cells)
+            agents.append(agent)
+        elif action < 0.7:
+            rng.choice(agents).cell = rng.choice(cells)
+        else:
+            agent = agents.pop(rng.randrange(len(agents)))
+            agent.remove()
+        expected = empty_cells(cells)
+        assert space.empty_count == len(expected)
+        assert set(space.empties) == expected
+        if expected:
+            assert space.select_random_empty_cell() in expected
+
+
+def test_random_empty_cell_is_seeded(kind):
+    picks = []
+    for _ in range(2):
+        space, cells = make_space(kind, seed=3)
+        model = Model(seed=0)
+        for cell in cells[::3]:
+            Walker(model).cell = cell
+        picks.append([space.select_random_empty_cell().coordinate for _ in range(10)])
+    assert picks[0] == picks[1]
+
+
+def test_no_empty_cell(kind):
+    space, cells = make_space(kind)
+    model = Model(seed=0)
+    for cell in cells:
+        Walker(model).cell = cell
+    assert space.empty_count == 0
+    with pytest.raises(IndexError):
+        space.select_random_empty_cell()
+
+
+def test_removal_swaps_in_the_last_agent(kind):
+    _, cells = make_space(kind)
+    model = Model(seed=0)
+    a, b, c, d = agents = [Walker(model) for _ in range(4)]
+    for agent in agents:
+        agent.cell = cells[0]
+    b.cell = cells[1]
+    assert list(cells[0].agents) == [a, d, c]
+    a.remove()
+    assert list(cells[0].agents) == [c, d]
+    d.cell = None
+    assert list(cells[0].agents) == [c]
+    with pytest.raises(ValueError):
+        cells[0].remove_agent(d)
+
+
+def test_removal_order_is_seeded(kind):
+    orders = []
+    for _ in range(2):
+        _, cells = make_space(kind)
+        model = Model(seed=5)
+        agents = [Walker(model) for _ in range(30)]
+        for agent in agents:
+            agent.cell = cells[0]
+        for agent in model.random.sample(agents, 20):
+            agent.remove()
+        orders.append([agent.unique_id for agent in cells[0].agents])
+    assert orders[0] == orders[1]
+
+
+@pytest.mark.parametrize("method", ["pickle", "deepcopy"])
+def test_snapshot_round_trip(method):
+    model = Model(seed=0)
+    grid = ArrayOrthogonalMooreGrid((6, 8), torus=True, capacity=3, random=model.random)
+    heat = grid.create_property_layer("heat", 0.0)
+    heat[:] = np.arange(48) / 2
+    cells = list(grid.all_cells)
+    for i in range(40):
+        Walker(model).cell = cells[(7 * i) % 48]
+    cells[5].get_neighborhood(radius=2)
+
+    if method == "pickle":
+        restored_model = pickle.loads(pickle.dumps(model))
+    else:
+        restored_model = copy.deepcopy(model)
+    agents = sorted(restored_model.agents, key=lambda agent: agent.unique_id)
+    restored = agents[0].cell.space
+
+    assert restored is not grid
+    assert restored._topology is grid._topology
+    np.testing.assert_array_equal(restored.property_layers["heat"], heat)
+    np.testing.assert_array_equal(restored._occupancy, grid._occupancy)
+    for original, copied in zip(cells, restored.all_cells):
+        assert [a.unique_id for a in copied.agents] == [a.unique_id for a in original.agents]
+        assert all(agent.cell == copied for agent in copied.agents)
+    assert set(c.coordinate for c in restored.empties) == set(c.coordinate for c in grid.empties)
+    neighborhood = restored[(0, 0)].get_neighborhood(radius=2)
+    assert {c.coordinate for c in neighborhood} == {
+        c.coordinate for c in grid[(0, 0)].get_neighborhood(radius=2)
+    }
+
+    # the copy is independent of the original
+    agents[0].cell = None
+    assert restored._occupancy.sum() == grid._occupancy.sum() - 1
+    restored.property_layers["heat"][0] = -1
+    assert heat[0] == 0
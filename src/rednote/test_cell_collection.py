@@ -0,0 +1,79 @@
+import random
+
+import pytest
+from mesa import Model
+
+from array_grid import ArrayOrthogonalMooreGrid
+from cell_agent import CellAgent
+from cell_collection import CellCollection
+
+
+class Red(CellAgent):
+    pass
+
+
+class Blue(CellAgent):
+    pass
+
+
+def allocated_lists(grid):
+    return sum(agents is not None for agents in grid._agents)
+
+
+@pytest.fixture
+def populated():
+    model = Model(seed=1)
+    grid = ArrayOrthogonalMooreGrid((20, 20), capacity=10, random=model.random)
+    cells = list(grid.all_cells)
+    rng = random.Random(0)
+    for i in range(150):
+        (Red if i % 2 else Blue)(model).cell = cells[rng.randrange(len(cells))]
+    return model, grid
+
+
+def test_reading_empty_cells_allocates_nothing():
+    grid = ArrayOrthogonalMooreGrid((300, 300), random=random.Random(0))
+    selected = grid.empties.select(lambda cell: True)
+    assert len(selected) == 90_000
+    neighborhood = next(iter(grid.all_cells)).get_neighborhood(radius=2).select(lambda cell: True)
+    for cell in neighborhood:
+        assert list(neighborhood[cell]) == []
+    repr(grid.empties.select(at_most=5))
+    assert allocated_lists(grid) == 0
+
+
+def test_only_occupied_cells_hold_lists(populated):
+    model, grid = populated
+    assert allocated_lists(grid) == len({agent.cell for agent in model.agents})
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"filter_func": lambda cell: cell.coordinate[0] % 3 == 0},
+        {"agent_type": Red},
+        {"agent_type": (Red, Blue), "at_most": 7},
+        {"filter_func": lambda cell: cell.is_empty, "at_most": 0.1},
+        {"at_most": 5},
+        {"agent_type": Red, "filter_func": lambda cell: cell.coordinate[1] > 5, "at_most": 4},
+    ],
+)
+def test_select_on_ids_same_as_on_cells(populated, kwargs):
+    model, grid = populated
+    by_ids = grid.all_cells.materialize()
+    by_cells = CellCollection(list(by_ids), random=model.random)
+
+    selected = by_ids.select(**kwargs)
+    assert selected._ids is not None
+    expected = by_cells.select(**kwargs)
+    assert list(selected) == list(expected)
+    for cell in selected:
+        assert list(selected[cell]) == list(expected[cell])
+
+
+def test_getitem_of_cell_outside_collection(populated):
+    _, grid = populated
+    reds = grid.all_cells.materialize().select(agent_type=Red)
+    outside = next(cell for cell in grid.all_cells if cell not in set(reds))
+    with pytest.raises(KeyError):
+        reds[outside]
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pytest
+from mesa import Model
+
+from array_grid import ArrayOrthogonalMooreGrid, ArrayOrthogonalVonNeumannGrid
+from cell_agent import CellAgent
+from density import DensityField
+from test_discrete_space import Ring
+
+
+class Post(CellAgent):
+    pass
+
+
+class Bot(CellAgent):
+    pass
+
+
+class Shill(Bot):
+    pass
+
+
+TYPES = [Post, Bot, (Post, Shill)]
+
+
+def populate(space, n=60, seed=0):
+    model = Model(seed=seed)
+    rng = random.Random(seed)
+    cells = list(space.all_cells)
+    for _ in range(n):
+        rng.choice([Post, Bot, Shill])(model).cell = rng.choice(cells)
+    return cells
+
+
+def assert_brute_force(field, cells):
+    for agent_type in field.agent_types:
+        expected = [
+            sum(
+                c.count_agents(agent_type)
+                for c in cell.get_neighborhood(field.radius, field.include_center)
+            )
+            for cell in cells
+        ]
+        assert field.counts(agent_type).tolist() == expected
+        assert [field.count(cell, agent_type) for cell in cells] == expected
+
+
+@pytest.mark.parametrize("grid", [ArrayOrthogonalMooreGrid, ArrayOrthogonalVonNeumannGrid])
+@pytest.mark.parametrize("torus", [False, True])
+@pytest.mark.parametrize("radius", [1, 2, 3, 4])
+@pytest.mark.parametrize("include_center", [False, True])
+def test_grid_counts_match_neighborhoods(grid, torus, radius, include_center):
+    # 7 x 9 cells, so the larger radii wrap around the torus onto themselves
+    space = grid((7, 9), torus=torus, capacity=None, random=random.Random(0))
+    cells = populate(space)
+    field = DensityField(space, radius, TYPES, include_center)
+    assert field._is_box() == (grid is ArrayOrthogonalMooreGrid and (not torus or radius < 4))
+    assert_brute_force(field, cells)
+
+
+@pytest.mark.parametrize("include_center", [False, True])
+def test_space_of_cells_counts_match_neighborhoods(include_center):
+    space = Ring(30)
+    cells = [space[(i,)] for i in range(30)]
+    model = Model(seed=1)
+    rng = random.Random(1)
+    for _ in range(40):
+        rng.choice([Post, Bot, Shill])(model).cell = rng.choice(cells)
+    field = DensityField(space, 3, TYPES, include_center)
+    assert_brute_force(field, cells)
+
+
+def test_update_follows_moves():
+    space = ArrayOrthogonalMooreGrid((10, 10), torus=False, capacity=None, random=random.Random(0))
+    cells = populate(space)
+    field = DensityField(space, 2, [Bot])
+    before = field.counts(Bot).copy()
+    for agent in list(space.agents):
+        agent.cell = cells[(cells.index(agent.cell) + 11) % len(cells)]
+    assert np.array_equal(field.counts(Bot), before)
+    field.update()
+    assert_brute_force(field, cells)
+
+
+def test_radius_must_be_at_least_one():
+    space = ArrayOrthogonalMooreGrid((4, 4), random=random.Random(0))
+    with pytest.raises(ValueError, match="at least one"):
+        DensityField(space, 0, [Bot])
@@ -0,0 +1,165 @@
+import pickle
+import random
+
+import pytest
+from mesa import Model
+
+from array_grid import ArrayOrthogonalMooreGrid
+from cell import Cell
+from cell_agent import CellAgent, FixedAgent
+from discrete_space import DiscreteSpace
+
+
+class Ring(DiscreteSpace):
+    """A ring of cells that fills its dict of cells directly, like the grids of Mesa."""
+
+    def __init__(self, n, fill="assign", capacity=None, seed=0):
+        super().__init__(capacity=capacity, random=random.Random(seed))
+        self.n = n
+        if fill == "assign":
+            self._cells = {(i,): Cell((i,), capacity, random=self.random) for i in range(n)}
+        else:
+            for i in range(n):
+                self._cells[(i,)] = Cell((i,), capacity, random=self.random)
+        self._connect_cells()
+
+    def _connect_cells(self):
+        for (i,), cell in self._cells.items():
+            for step in (-1, 1):
+                cell.connect(self._cells[((i + step) % self.n,)], (step,))
+
+
+@pytest.mark.parametrize("fill", ["assign", "items"])
+def test_cells_registered_when_added(fill):
+    ring = Ring(20, fill)
+    cell = ring[(0,)]
+    assert all(c.space is ring for c in ring)
+
+    neighborhood = cell.get_neighborhood(radius=3)
+    info = ring.neighborhood_index.cache_info()
+    assert (info.misses, info.hits) == (1, 0)
+    assert set(neighborhood) == set(cell._neighborhood(radius=3))
+
+
+def test_registration_survives_pickle():
+    ring = pickle.loads(pickle.dumps(Ring(10)))
+    assert all(c.space is ring for c in ring)
+    ring._cells[(10,)] = Cell((10,), random=ring.random)
+    assert ring[(10,)].space is ring
+
+
+def make_space(kind, capacity=1, seed=0):
+    if kind == "cells":
+        space = Ring(8, capacity=capacity, seed=seed)
+        return space, [space[(i,)] for i in range(8)]
+    space = ArrayOrthogonalMooreGrid((8, 1), capacity=capacity, random=random.Random(seed))
+    return space, list(space.all_cells)
+
+
+def place(model, cells, *indices, klass=CellAgent):
+    agents = [klass(model) for _ in indices]
+    for agent, i in zip(agents, indices):
+        agent.cell = cells[i]
+    return agents
+
+
+@pytest.fixture(params=["cells", "array"])
+def kind(request):
+    return request.param
+
+
+def test_move_many_moves_agents(kind):
+    space, cells = make_space(kind)
+    a, b = place(Model(), cells, 0, 1)
+    assert space.move_many([a, b], [cells[2], cells[3]]) == [True, True]
+    assert (a.cell, b.cell) == (cells[2], cells[3])
+    assert cells[0].is_empty and cells[1].is_empty
+    assert list(cells[2].agents) == [a]
+    assert space.empty_count == 6
+
+
+def test_move_many_swaps_within_full_cells(kind):
+    space, cells = make_space(kind)
+    a, b = place(Model(), cells, 0, 1)
+    assert space.move_many([a, b], [cells[1], cells[0]]) == [True, True]
+    assert (a.cell, b.cell) == (cells[1], cells[0])
+    assert space.empty_count == 6
+
+
+def test_move_many_first_wins(kind):
+    space, cells = make_space(kind)
+    a, b = place(Model(), cells, 0, 1)
+    assert space.move_many([a, b], [cells[2], cells[2]], policy="first") == [True, False]
+    assert (a.cell, b.cell) == (cells[2], cells[1])
+
+
+def test_move_many_reject(kind):
+    space, cells = make_space(kind, capacity=2)
+    a, b, c = place(Model(), cells, 0, 1, 3)
+    # two of the three fit, none of them enters
+    assert space.move_many([a, b, c], [cells[2]] * 3, policy="reject") == [False] * 3
+    assert (a.cell, b.cell, c.cell) == (cells[0], cells[1], cells[3])
+    assert cells[2].is_empty
+
+
+def test_move_many_random_is_seeded(kind):
+    outcomes = set()
+    for seed in range(20):
+        results = []
+        for _ in range(2):
+            space, cells = make_space(kind, seed=seed)
+            agents = place(Model(), cells, 0, 1, 3)
+            results.append(space.move_many(agents, [cells[2]] * 3, policy="random"))
+        assert results[0] == results[1]
+        assert sum(results[0]) == 1
+        outcomes.add(tuple(results[0]))
+    assert len(outcomes) > 1
+
+
+@pytest.mark.parametrize("policy", ["first", "reject"])
+def test_move_many_rejections_cascade(kind, policy):
+    space, cells = make_space(kind)
+    c, b, a = place(Model(), cells, 3, 1, 0)
+    # b loses cells[2] to c under "first", or both lose it under "reject", so b stays
+    # in cells[1] and a cannot enter it
+    results = space.move_many([c, b, a], [cells[2], cells[2], cells[1]], policy=policy)
+    assert results == ([True, False, False] if policy == "first" else [False] * 3)
+    assert (b.cell, a.cell) == (cells[1], cells[0])
+    assert len(cells[1].agents) == 1
+
+
+def test_move_many_none_removes(kind):
+    space, cells = make_space(kind)
+    a, b = place(Model(), cells, 0, 1)
+    # a leaves, which frees its cell for b
+    assert space.move_many([a, b], [None, cells[0]]) == [True, True]
+    assert a.cell is None
+    assert list(cells[0].agents) == [b]
+    assert space.empty_count == 7
+
+
+def test_move_many_staying_is_not_moving(kind):
+    space, cells = make_space(kind)
+    a, b = place(Model(), cells, 0, 1)
+    assert space.move_many([a, b], [cells[0], cells[2]]) == [False, True]
+    assert a.cell == cells[0]
+
+
+def test_move_many_fixed_agents(kind):
+    space, cells = make_space(kind)
+    model = Model()
+    (fixed,) = place(model, cells, 0, klass=FixedAgent)
+    (mobile,) = place(model, cells, 1)
+    assert space.move_many([fixed, mobile], [cells[0], cells[2]]) == [False, True]
+    with pytest.raises(ValueError):
+        space.move_many([fixed], [cells[3]])
+    assert fixed.cell == cells[0]
+
+
+def test_move_many_arguments(kind):
+    space, cells = make_space(kind)
+    (a,) = place(Model(), cells, 0)
+    with pytest.raises(ValueError):
+        space.move_many([a], [cells[1]], policy="best")
+    with pytest.raises(ValueError):
+        space.move_many([a], [cells[1], cells[2]])
@@ -0,0 +1,88 @@
+import gc
+import random
+import weakref
+
+import pytest
+
+from array_grid import ArrayOrthogonalMooreGrid
+from neighborhood import NeighborhoodIndex
+from test_discrete_space import Ring
+
+
+def table_sizes(space, radii):
+    index = NeighborhoodIndex(space)
+    return {radius: index.table(radius).nbytes for radius in radii}
+
+
+def test_hits_and_misses():
+    space = Ring(40)
+    index = space.neighborhood_index
+    space[(0,)].get_neighborhood(radius=2)
+    space[(5,)].get_neighborhood(radius=2)
+    space[(5,)].get_neighborhood(radius=1)
+    info = index.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+    assert info.nbytes == sum(table_sizes(space, [1, 2]).values())
+
+
+def test_least_recently_used_table_is_evicted():
+    space = Ring(40)
+    sizes = table_sizes(space, [1, 2, 3])
+    # room for any two of the tables, not for all three
+    index = NeighborhoodIndex(space, max_bytes=sum(sizes.values()) - 1)
+    for radius in (1, 2, 3):
+        index.table(radius)
+    assert list(index._tables) == [2, 3]
+    index.table(2)
+    index.table(1)
+    assert list(index._tables) == [2, 1]
+    info = index.cache_info()
+    assert (info.hits, info.misses, info.evictions) == (1, 4, 2)
+    assert info.nbytes == sizes[1] + sizes[2] <= info.max_bytes
+
+
+def test_most_recent_table_kept_over_budget():
+    index = NeighborhoodIndex(Ring(40), max_bytes=1)
+    index.table(1)
+    index.table(2)
+    assert list(index._tables) == [2]
+    assert index.cache_info().evictions == 1
+
+
+def test_connections_invalidate():
+    space = Ring(40)
+    cell, far = space[(0,)], space[(20,)]
+    assert far not in set(cell.get_neighborhood(radius=2))
+
+    cell.connect(far, (20,))
+    assert space.neighborhood_index.cache_info().invalidations == 1
+    assert far in set(cell.get_neighborhood(radius=1))
+    assert space[(21,)] in set(cell.get_neighborhood(radius=2))
+
+    cell.disconnect(far)
+    assert space.neighborhood_index.cache_info().invalidations == 2
+    assert far not in set(cell.get_neighborhood(radius=2))
+
+
+def test_spaces_are_not_kept_alive():
+    space = Ring(40)
+    space[(0,)].get_neighborhood(radius=3)
+    ref = weakref.ref(space)
+    del space
+    gc.collect()
+    assert ref() is None
+
+
+def test_array_grids_share_tables_by_topology():
+    first = ArrayOrthogonalMooreGrid((10, 10), random=random.Random(0))
+    second = ArrayOrthogonalMooreGrid((10, 10), random=random.Random(1))
+    assert first.neighborhood_index is second.neighborhood_index
+    first[(0, 0)].get_neighborhood(radius=2)
+    misses = first.neighborhood_index.cache_info().misses
+    second[(3, 3)].get_neighborhood(radius=2)
+    assert second.neighborhood_index.cache_info().misses == misses
+
+
+def test_radius_must_be_at_least_one():
+    with pytest.raises(ValueError, match="at least one"):
+        NeighborhoodIndex(Ring(10)).table(0)
@@ -0,0 +1,191 @@
+"""Structure-of-arrays storage for agent attributes.
+
+Agents normally keep their state in instance attributes, so model level code that
+updates, say, the trust of every user has to loop over the agents in Python. An
+`AgentTable` instead keeps the attributes of all agents of one class in NumPy
+columns, one row per agent. The agents become thin handles that only know their
+table and row, and model code can work on whole columns at once::
+
+    users = AgentTable(UserAgent, {"trust": float, "pos": (float, 2)})
+    for user in new_users:
+        users.add(user)
+    users.column("trust")[:] *= 0.95  # all users at once
+
+Creating a table turns the columns into `Column` attributes of the agent class,
+which read from and write to the table of an agent. Agents that are not in a table
+keep their attributes in their instance dictionary, so the same agent classes work
+with and without tables, and classes that never get a table keep plain attribute
+access.
+
+The `pos` column is special: a missing position (``None``) is stored as NaN, and
+positions are read back as tuples, as `ContinuousSpace` expects. Positions are
+written by the space, code that moves agents by writing the column directly has
+to keep the space up to date itself.
+
+Removing an agent moves the last row into its place, so rows are always dense and
+columns can be used without masking, but the row of an agent can change whenever
+another agent is removed.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+from mesa import Agent
+
+# a column is declared by its dtype, or by (dtype, width) for vector valued columns
+ColumnSpec = Any
+
+_MISSING = object()
+
+
+class Column:
+    """Agent attribute stored in the `AgentTable` of the agent, if it has one."""
+
+    def __init__(self, name: str | None = None) -> None:
+        """Create a column attribute, the name is set automatically in a class body."""
+        self.name = name
+
+    def __set_name__(self, owner: type, name: str) -> None:  # noqa: D105
+        self.name = name
+
+    def __get__(self, agent: Agent | None, owner: type) -> Any:  # noqa: D105
+        if agent is None:
+            return self
+        # agents in a table have no instance attribute for the column
+        value = agent.__dict__.get(self.name, _MISSING)
+        if value is not _MISSING:
+            return value
+        table = agent.__dict__.get("_table")
+        if table is None:
+            raise AttributeError(self.name)
+        return table.get(agent._row, self.name)
+
+    def __set__(self, agent: Agent, value: Any) -> None:  # noqa: D105
+        table = agent.__dict__.get("_table")
+        if table is None:
+            agent.__dict__[self.name] = value
+        else:
+            table.set(agent._row, self.name, value)
+
+
+class AgentTable:
+    """The attributes of all agents of one class, stored in NumPy columns.
+
+    Attributes:
+        agent_class (type): the class of the agents in the table
+        agents (list[Agent]): the agents in the table, the agent in row i is agents[i]
+
+    """
+
+    def __init__(
+        self,
+        agent_class: type,
+        columns: Mapping[str, ColumnSpec],
+        capacity: int = 64,
+    ) -> None:
+        """Create an empty table.
+
+        Args:
+            agent_class: the class of the agents stored in the table
+            columns: dtype, or (dtype, width), of every column
+            capacity: number of rows to allocate initially, the table grows as needed
+        """
+        self.agent_class = agent_class
+        self.agents: list[Agent] = []
+        self._specs = dict(columns)
+        self._install_columns()
+        self._data: dict[str, np.ndarray] = {}
+        for name, spec in self._specs.items():
+            dtype, width = spec if isinstance(spec, tuple) else (spec, None)
+            shape = (capacity,) if width is None else (capacity, width)
+            self._data[name] = np.zeros(shape, dtype=dtype)
+
+    def _install_columns(self) -> None:
+        agent_class = self.agent_class
+        for name in self._specs:
+            attribute = getattr(agent_class, name, None)
+            if attribute is None:
+                setattr(agent_class, name, Column(name))
+            elif not isinstance(attribute, Column):
+                raise ValueError(f"{agent_class.__name__}.{name} cannot be stored in a column")
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore a table, e.g. from a checkpoint written by another process."""
+        self.__dict__.update(state)
+        self._install_columns()
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.agents)
+
+    @property
+    def columns(self) -> list[str]:
+        """Return the names of the columns."""
+        return list(self._specs)
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a writable view of a column, row i belongs to agents[i]."""
+        return self._data[name][: len(self.agents)]
+
+    def add(self, agent: Agent) -> None:
+        """Add an agent to the table.
+
+        Attributes the agent already has for the columns of the table are moved into
+        the table, the other columns of the row are zero.
+        """
+        if type(agent) is not self.agent_class:
+            raise TypeError(
+                f"Cannot add {type(agent).__name__} to a table of {self.agent_class.__name__}"
+            )
+        if agent.__dict__.get("_table") is not None:
+            raise ValueError("Agent is already in a table")
+        row = len(self.agents)
+        if row == len(next(iter(self._data.values()), ())):
+            self._grow()
+        self.agents.append(agent)
+        for name in self._specs:
+            self._data[name][row] = 0
+        agent.__dict__["_row"] = row
+        agent.__dict__["_table"] = self
+        for name in self._specs:
+            if name in agent.__dict__:
+                self.set(row, name, agent.__dict__.pop(name))
+
+    def remove(self, agent: Agent) -> None:
+        """Remove an agent from the table, its attributes move back to the agent."""
+        row = agent._row
+        values = {name: self.get(row, name) for name in self._specs}
+        last = len(self.agents) - 1
+        if row != last:
+            moved = self.agents[last]
+            for data in self._data.values():
+                data[row] = data[last]
+            self.agents[row] = moved
+            moved.__dict__["_row"] = row
+        self.agents.pop()
+        del agent.__dict__["_row"]
+        del agent.__dict__["_table"]
+        agent.__dict__.update(values)
+
+    def get(self, row: int, name: str) -> Any:
+        """Return the value of a column for one row."""
+        value = self._data[name][row]
+        if name == "pos":
+            if np.isnan(value[0]):
+                return None
+            return tuple(value.tolist())
+        return value.item()
+
+    def set(self, row: int, name: str, value: Any) -> None:
+        """Set the value of a column for one row."""
+        if name == "pos" and value is None:
+            value = np.nan
+        self._data[name][row] = value
+
+    def _grow(self) -> None:
+        for name, data in self._data.items():
+            grown = np.zeros((max(2 * len(data), 1), *data.shape[1:]), dtype=data.dtype)
+            grown[: len(data)] = data
+            self._data[name] = grown
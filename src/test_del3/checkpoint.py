@@ -0,0 +1,196 @@
+"""Checkpoint and restore of running models.
+
+A checkpoint is a single pickle holding the complete model: its agents, space,
+`DataCollector` buffers and random number generators (`model.random` and
+`model.rng`). Because models often also draw from the global generators, the
+states of `random` and `numpy.random` are stored alongside, so a model restored
+from a checkpoint continues bit-identically to the run that wrote it.
+
+Model reporters are usually lambdas, which the standard library pickle cannot
+serialize. If `cloudpickle` is installed it is used to write checkpoints,
+otherwise only models without lambdas or local functions can be checkpointed.
+Checkpoints can be read with the standard library pickle either way, as long as
+cloudpickle is importable.
+
+`dumps_checkpoint` and `loads_checkpoint` do the same in memory, e.g. to hand the
+state of a model to worker processes.
+
+Typical use is a `Checkpointer` that is called at the end of every step::
+
+    self.checkpointer = Checkpointer(self, "checkpoints", every=100)
+    ...
+    def step(self):
+        ...
+        self.checkpointer.step()
+
+and, after a crash, ``model = load_checkpoint(latest_checkpoint("checkpoints"))``.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import random
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+try:
+    import cloudpickle
+except ImportError:
+    cloudpickle = None
+
+if TYPE_CHECKING:
+    from mesa import Model
+
+CHECKPOINT_VERSION = 1
+
+
+def dumps_checkpoint(model: Model) -> bytes:
+    """Return a checkpoint of the model, including the global random states, as bytes."""
+    state = {
+        "version": CHECKPOINT_VERSION,
+        "model": model,
+        "random": random.getstate(),
+        "np_random": np.random.get_state(),
+    }
+    dumps = cloudpickle.dumps if cloudpickle is not None else pickle.dumps
+    return dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads_checkpoint(data: bytes, restore_global_random: bool = True) -> Model:
+    """Restore a model from a checkpoint returned by `dumps_checkpoint`.
+
+    Args:
+        data: the checkpoint
+        restore_global_random: also restore the states of the global `random` and
+            `numpy.random` generators, needed to resume models that use them
+
+    Returns:
+        the restored model, ready to continue stepping
+
+    """
+    state: dict[str, Any] = pickle.loads(data)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {state.get('version')}")
+    if restore_global_random:
+        random.setstate(state["random"])
+        np.random.set_state(state["np_random"])
+    return state["model"]
+
+
+def save_checkpoint(model: Model, path: str | os.PathLike) -> Path:
+    """Write a checkpoint of the model to path.
+
+    The file is written next to its destination first and then moved into place,
+    so an interrupted save never leaves a truncated checkpoint behind.
+
+    Args:
+        model: the model to checkpoint
+        path: the file to write
+
+    Returns:
+        the path of the checkpoint
+
+    """
+    path = Path(path)
+    data = dumps_checkpoint(model)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def load_checkpoint(path: str | os.PathLike, restore_global_random: bool = True) -> Model:
+    """Restore a model from a checkpoint file.
+
+    Args:
+        path: the checkpoint file
+        restore_global_random: also restore the states of the global `random` and
+            `numpy.random` generators, needed to resume models that use them
+
+    Returns:
+        the restored model, ready to continue stepping
+
+    """
+    with open(path, "rb") as f:
+        return loads_checkpoint(f.read(), restore_global_random)
+
+
+def latest_checkpoint(directory: str | os.PathLike) -> Path | None:
+    """Return the most recent checkpoint written by a Checkpointer, None if there is none."""
+    checkpoints = sorted(Path(directory).glob("checkpoint_*.pkl"))
+    return checkpoints[-1] if checkpoints else None
+
+
+class Checkpointer:
+    """Write checkpoints of a model every few steps.
+
+    The checkpointer counts the steps itself, as models do not agree on how they
+    count them, e.g. a model that increments `Model.steps` in its own step as well
+    advances it twice per step. Checkpoints are named after that count, e.g.
+    ``checkpoint_00000100.pkl``, so `latest_checkpoint` finds the most recent one.
+
+    Attributes:
+        model (Model): the model to checkpoint
+        directory (Path): the directory checkpoints are written to
+        every (int): number of steps between checkpoints
+        keep (int | None): number of most recent checkpoints to keep, None keeps all
+        steps (int): number of steps since the checkpointer was created
+
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        directory: str | os.PathLike,
+        every: int = 100,
+        keep: int | None = 2,
+    ) -> None:
+        """Initialize a Checkpointer.
+
+        Args:
+            model: the model to checkpoint
+            directory: the directory checkpoints are written to
+            every: number of steps between checkpoints
+            keep: number of most recent checkpoints to keep, None keeps all
+        """
+        if every < 1:
+            raise ValueError("every must be at least one")
+        if keep is not None and keep < 1:
+            raise ValueError("keep must be at least one")
+        self.model = model
+        self.directory = Path(directory)
+        self.every = every
+        self.keep = keep
+        self.steps = 0
+
+    def step(self) -> Path | None:
+        """Count a step and write a checkpoint every `every` steps.
+
+        Call this once at the end of `Model.step`.
+
+        Returns:
+            the path of the written checkpoint, None if no checkpoint was due
+
+        """
+        self.steps += 1
+        if self.steps % self.every:
+            return None
+        return self.save()
+
+    def save(self) -> Path:
+        """Write a checkpoint of the current state of the model."""
+        path = save_checkpoint(
+            self.model, self.directory / f"checkpoint_{self.steps:08d}.pkl"
+        )
+        if self.keep is not None:
+            for old in sorted(self.directory.glob("checkpoint_*.pkl"))[: -self.keep]:
+                old.unlink()
+        return path
@@ -0,0 +1,144 @@
+"""Model data collection into preallocated NumPy columns.
+
+`mesa.DataCollector` appends the value of every model reporter to a Python list
+each step, so a long run keeps millions of boxed Python scalars in memory, and
+turning them into a table copies all of them again. A `ColumnarDataCollector`
+stores every reporter in its own NumPy array, allocated for the planned number of
+steps up front and doubled if a run goes on longer, so collecting a step writes one
+value per reporter in place, and the collected data is exported without conversion.
+
+Reporters are called with the model, like the model reporters of Mesa. They can
+return a scalar, or a NumPy array of fixed length for reporters that summarize a
+whole agent column at once, e.g. a histogram of the trust of all users read from an
+`AgentTable` column. The dtype of a reporter is taken from its first value and
+widened if a later value needs it, e.g. a count that becomes a mean.
+
+The data can be exported to pandas, with `get_model_vars_dataframe` like Mesa, and
+to Arrow and Parquet if pyarrow is installed.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+class ColumnarDataCollector:
+    """Collects model level data into one preallocated NumPy array per reporter.
+
+    Attributes:
+        model_reporters (dict[str, Callable]): the reporter of every column
+        steps (int): the number of steps collected so far
+
+    """
+
+    def __init__(
+        self,
+        model_reporters: Mapping[str, Callable[[Any], Any]],
+        planned_steps: int = 1000,
+    ) -> None:
+        """Create a collector.
+
+        Args:
+            model_reporters: the reporter of every column, called with the model
+            planned_steps: the number of steps to allocate the columns for, the columns
+                grow as needed
+        """
+        if planned_steps < 1:
+            raise ValueError("planned_steps must be at least one")
+        self.model_reporters = dict(model_reporters)
+        self.steps = 0
+        self._capacity = planned_steps
+        # allocated at the first collect, when the dtypes and shapes are known
+        self._data: dict[str, np.ndarray] = {}
+
+    def collect(self, model: Any) -> None:
+        """Call all reporters and store their values as the next row.
+
+        A reporter must return values of the same shape at every step, a ValueError is
+        raised otherwise.
+        """
+        row = self.steps
+        if row == self._capacity and self._data:
+            self._grow()
+        for name, reporter in self.model_reporters.items():
+            value = np.asarray(reporter(model))
+            data = self._data.get(name)
+            if data is None:
+                data = np.zeros((self._capacity, *value.shape), dtype=value.dtype)
+                self._data[name] = data
+            elif value.shape != data.shape[1:]:
+                raise ValueError(
+                    f"reporter {name!r} returned shape {value.shape}, "
+                    f"earlier steps returned {data.shape[1:]}"
+                )
+            elif value.dtype != data.dtype and not np.can_cast(value.dtype, data.dtype):
+                data = data.astype(np.result_type(data.dtype, value.dtype))
+                self._data[name] = data
+            data[row] = value
+        self.steps = row + 1
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for name, data in self._data.items():
+            grown = np.zeros((self._capacity, *data.shape[1:]), dtype=data.dtype)
+            grown[: len(data)] = data
+            self._data[name] = grown
+
+    @property
+    def model_vars(self) -> dict[str, np.ndarray]:
+        """Return the collected values of every reporter, one row per step."""
+        return {name: data[: self.steps] for name, data in self._data.items()}
+
+    def get_model_vars_dataframe(self) -> pd.DataFrame:
+        """Return the collected data as a pandas DataFrame, one row per step.
+
+        Reporters that return arrays get one column per element, named ``name[i]``.
+        """
+        columns = {}
+        for name, values in self.model_vars.items():
+            if values.ndim == 1:
+                columns[name] = values.copy()
+            else:
+                flat = values.reshape(self.steps, -1)
+                for i in range(flat.shape[1]):
+                    columns[f"{name}[{i}]"] = flat[:, i].copy()
+        return pd.DataFrame(columns)
+
+    def to_arrow(self):
+        """Return the collected data as a `pyarrow.Table`, one row per step.
+
+        Reporters that return arrays become fixed size list columns.
+        """
+        if pa is None:
+            raise ImportError("Exporting to Arrow requires pyarrow")
+        columns = {}
+        for name, values in self.model_vars.items():
+            if values.ndim == 1:
+                columns[name] = pa.array(values)
+            else:
+                flat = values.reshape(self.steps, -1)
+                columns[name] = pa.FixedSizeListArray.from_arrays(
+                    pa.array(flat.ravel()), flat.shape[1]
+                )
+        return pa.table(columns)
+
+    def to_parquet(self, path: str, **kwargs: Any) -> None:
+        """Write the collected data to a Parquet file.
+
+        Args:
+            path: the file to write
+            kwargs: passed on to `pyarrow.parquet.write_table`, e.g. compression
+        """
+        if pq is None:
+            raise ImportError("Exporting to Parquet requires pyarrow")
+        pq.write_table(self.to_arrow(), path, **kwargs)
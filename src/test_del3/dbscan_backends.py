@@ -0,0 +1,62 @@
+"""Interchangeable DBSCAN engines for the bot cluster detectors.
+
+All engines are used the same way, ``engine.fit(positions, ids).labels_``, and give
+identical labels:
+- ``"incremental"``: `IncrementalDBSCAN`, reuses the neighbor pairs between calls
+- ``"grid"``: `GridDBSCAN`, a NumPy search on a grid with cells of size eps
+- ``"sklearn"``: `sklearn.cluster.DBSCAN`, imported only when it is selected
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from grid_dbscan import GridDBSCAN
+from incremental_dbscan import IncrementalDBSCAN
+
+
+class SklearnDBSCAN:
+    """`sklearn.cluster.DBSCAN` refitted from scratch on every call."""
+
+    def __init__(self, eps: float = 0.5, min_samples: int = 5) -> None:
+        """Create a clustering engine, see `sklearn.cluster.DBSCAN`."""
+        from sklearn.cluster import DBSCAN
+
+        self.eps = eps
+        self.min_samples = min_samples
+        self._dbscan = DBSCAN(eps=eps, min_samples=min_samples)
+        self.labels_ = np.zeros(0, dtype=np.intp)
+        self.core_sample_indices_ = np.zeros(0, dtype=np.intp)
+
+    def fit(self, positions: np.ndarray, ids: np.ndarray | None = None) -> SklearnDBSCAN:
+        """Cluster the points, ids are ignored."""
+        self._dbscan.fit(positions)
+        self.labels_ = self._dbscan.labels_
+        self.core_sample_indices_ = self._dbscan.core_sample_indices_
+        return self
+
+
+BACKENDS = {
+    "incremental": IncrementalDBSCAN,
+    "grid": GridDBSCAN,
+    "sklearn": SklearnDBSCAN,
+}
+
+
+def make_dbscan(backend: str, eps: float, min_samples: int):
+    """Return a DBSCAN engine.
+
+    Args:
+        backend: the name of the engine, one of BACKENDS
+        eps: the maximum distance between two neighboring points
+        min_samples: the number of points within eps, including the point itself,
+            for a point to be a core point
+
+    """
+    try:
+        engine = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"unknown DBSCAN backend {backend!r}, choose one of {', '.join(BACKENDS)}"
+        ) from None
+    return engine(eps=eps, min_samples=min_samples)
@@ -1,8 +1,10 @@
 import numpy as np
 from mesa import Agent, Model
-from mesa.space import ContinuousSpace
 from mesa.visualization import Slider, SolaraViz, make_space_component
-from sklearn.cluster import DBSCAN
+
+from dbscan_backends import make_dbscan
+from detection_schedule import DetectionScheduler
+from spatial_hash import HashedContinuousSpace
 #from textblob import TextBlob
 
 # 二维空间维度配置 - 移除 time_window
@@ -43,8 +45,7 @@ class AdBotAgent(Agent):
         )
 
     def find_target(self):
-        neighbors = self.model.space.get_neighbors(self.position, 10) # Removed agent_type argument
-        posts = [agent for agent in neighbors if isinstance(agent, OriginalPostAgent)] # Filter manually
+        posts = self.model.space.get_neighbors(self.position, 10, agent_type=OriginalPostAgent)
         if posts:
             self.target_post = max(posts, key=lambda p: p.base_heat * np.random.rand())
             self.generate_ad()
@@ -74,7 +75,7 @@ class AdBotAgent(Agent):
             self.position = self.random_position()
         else:
             self.move()
-        self.cluster_size = 1 + len(self.model.space.get_neighbors(self.position, 5))
+        self.cluster_size = 1 + self.model.space.count_neighbors(self.position, 5)
 
 class ShillBotAgent(Agent):
     def __init__(self, model):
@@ -97,8 +98,7 @@ class ShillBotAgent(Agent):
             1.2 * (1 - detection)
         ])
 
-    def flocking_behavior(self, neighbors):
-        shill_neighbors = [n for n in neighbors if isinstance(n, ShillBotAgent)] # Filter for ShillBotAgent neighbors
+    def flocking_behavior(self, shill_neighbors):
         positions = np.array([n.position for n in shill_neighbors]) # Use only ShillBotAgent positions
 
         if not shill_neighbors: # Handle case where there are no ShillBotAgent neighbors
@@ -120,9 +120,9 @@ class ShillBotAgent(Agent):
 
     def step(self):
         self.update_weights()
-        neighbors = self.model.space.get_neighbors(self.position, 10)
-        if neighbors:
-            flock_vec = self.flocking_behavior(neighbors)
+        if self.model.space.count_neighbors(self.position, 10):
+            shill_neighbors = self.model.space.get_neighbors(self.position, 10, agent_type=ShillBotAgent)
+            flock_vec = self.flocking_behavior(shill_neighbors)
             self.velocity = 0.2*self.velocity + 0.8*flock_vec
             self.position = tuple(np.array(self.position) + self.velocity)
         self.position = tuple(np.clip(self.position,
@@ -144,12 +144,10 @@ class UserAgent(Agent):
         )
 
     def update_emotion(self):
-        neighbors_ads = self.model.space.get_neighbors(self.position, 5)
-        ads = [agent for agent in neighbors_ads if isinstance(agent, AdBotAgent)]
-        ad_influence = len(ads) * 0.02  # **Correct definition of ad_influence**
+        ads = self.model.space.count_neighbors(self.position, 5, AdBotAgent)
+        ad_influence = ads * 0.02  # **Correct definition of ad_influence**
         social_proof = np.mean([u.emotion for u in
-                                   self.model.space.get_neighbors(self.position, 3) # Removed agent_type argument here as well, consistent with previous fixes
-                                   if isinstance(u, UserAgent)] # Manual filtering for UserAgent neighbors
+                                   self.model.space.get_neighbors(self.position, 3, agent_type=UserAgent)]
                                 or [0.5])
         self.emotion = np.clip(
             self.emotion + ad_influence*self.trust + 0.1*(social_proof - 0.5),
@@ -165,34 +163,70 @@ class UserAgent(Agent):
         self.update_emotion()
 
 class PlatformAI:
-    def __init__(self, model):
+    def __init__(self, model, cluster_backend="incremental", detection_interval=1,
+                 adaptive_detection=False, async_detection=False, detection_lag=None):
         self.model = model
         self.boost_threshold = 0.6
         self.limit_threshold = 0.8
+        # 聚类引擎可选 "incremental"、"grid" 或 "sklearn"，标签都与 DBSCAN(eps=5, min_samples=3) 相同
+        self.clustering = make_dbscan(cluster_backend, eps=5, min_samples=3)
+        # 检测调度：按间隔、随广告机器人密度自适应或在后台线程运行，
+        # detection_lag 步之后（默认 1 步）才应用后台检测的结果，让聚类与代理的移动重叠
+        self.detection = DetectionScheduler(
+            self.prepare_engagement,
+            self.detect_engagement,
+            self.apply_engagement,
+            interval=detection_interval,
+            adaptive=adaptive_detection,
+            density=self.ad_density,
+            asynchronous=async_detection,
+            lag=detection_lag,
+        )
 
     def analyze_engagement(self):
+        frozen = self.prepare_engagement()
+        if frozen is not None:
+            self.apply_engagement(frozen, self.detect_engagement(frozen))
+
+    def prepare_engagement(self):
+        # 冻结广告机器人的位置，机器人太少时不检测
         all_ads = [a for a in self.model.agents if isinstance(a, AdBotAgent)]
+        if len(all_ads) <= 10:
+            return None
         positions = np.array([a.position for a in all_ads])
+        ids = np.array([a.unique_id for a in all_ads])
+        return all_ads, positions, ids
 
-        if len(positions) > 10:
-            # 第一阶段：推流算法
-            clustering = DBSCAN(eps=5, min_samples=3).fit(positions) # 修正为 2D 聚类
-            cluster_ratio = len(np.unique(clustering.labels_)) / len(positions)
+    def detect_engagement(self, frozen):
+        # 只读冻结的输入，可在后台线程运行
+        _, positions, ids = frozen
+        return self.clustering.fit(positions, ids).labels_ # 修正为 2D 聚类
 
-            if cluster_ratio < self.boost_threshold:
-                self.boost_posts(positions)
+    def apply_engagement(self, frozen, labels):
+        all_ads, positions, _ = frozen
+        # 第一阶段：推流算法
+        cluster_ratio = len(np.unique(labels)) / len(positions)
 
-            # 第二阶段：限流检测
-            if cluster_ratio > self.limit_threshold:
-                self.limit_flow(clustering.labels_)
+        if cluster_ratio < self.boost_threshold:
+            self.boost_posts(positions)
+
+        # 第二阶段：限流检测
+        if cluster_ratio > self.limit_threshold:
+            self.limit_flow(all_ads, labels)
+
+    def ad_density(self):
+        # 每 100 单位面积上的广告机器人数
+        ads = sum(isinstance(a, AdBotAgent) for a in self.model.agents)
+        return 100 * ads / (SPACE_DIMENSIONS['topic_heat'][1] * SPACE_DIMENSIONS['sentiment'][1])
 
     def boost_posts(self, positions):
         heat_center = np.mean(positions[:, 0])
         self.model.heat_modifier = 1.5 + 0.5 * np.sin(self.model.steps/10)
 
-    def limit_flow(self, labels):
-        for agent, label in zip(self.model.agents, labels):
-            if isinstance(agent, AdBotAgent) and label != -1:
+    def limit_flow(self, ads, labels):
+        # 标签与冻结时的广告机器人一一对应，跳过此后已被移除的机器人
+        for agent, label in zip(ads, labels):
+            if agent.pos is not None and label != -1:
                 agent.speed *= 0.7
                 agent.cluster_size = max(1, agent.cluster_size-2)
                 if np.random.rand() < 0.1:  # 10% chance to remove the AdBotAgent
@@ -202,12 +236,19 @@ class PlatformAI:
 class SocialMediaModel(Model):
     def __init__(self, **kwargs):
         super().__init__()
-        self.space = ContinuousSpace(
+        self.space = HashedContinuousSpace(
             SPACE_DIMENSIONS['topic_heat'][1],  # x_max (话题热度的最大值)
             SPACE_DIMENSIONS['sentiment'][1], # y_max (情感倾向的最大值)
             torus=False
         )
-        self.platform_ai = PlatformAI(self)
+        self.platform_ai = PlatformAI(
+            self,
+            kwargs.get('cluster_backend', 'incremental'),
+            kwargs.get('detection_interval', 1),
+            kwargs.get('adaptive_detection', False),
+            kwargs.get('async_detection', False),
+            kwargs.get('detection_lag'),
+        )
         self.heat_modifier = 1.0
         self.detection_intensity = 0.5
 
@@ -217,6 +258,11 @@ class SocialMediaModel(Model):
         self.create_agents(ShillBotAgent, kwargs.get('num_shills', 40))
         self.create_agents(UserAgent, kwargs.get('num_users', 50))
 
+    def __getstate__(self):
+        # 序列化前等待后台检测结束，否则聚类引擎可能在工作线程更新到一半时被序列化
+        self.platform_ai.detection.wait()
+        return self.__dict__.copy()
+
     def create_agents(self, agent_type, num):
         for _ in range(num):
             agent = agent_type(self)
@@ -224,7 +270,7 @@ class SocialMediaModel(Model):
 
     def step(self):
         self.agents.do("step")
-        self.platform_ai.analyze_engagement()
+        self.platform_ai.detection.step()
         self.detection_intensity = min(1.0, self.detection_intensity + 0.01)
 
 def agent_portrayal(agent):
@@ -246,7 +292,7 @@ def agent_portrayal(agent):
         }
 
     elif isinstance(agent, ShillBotAgent):
-        neighbors = len(agent.model.space.get_neighbors(agent.position, 5))
+        neighbors = agent.model.space.count_neighbors(agent.position, 5)
         return {
             "marker": "^",
             "color": "#00FF00" if neighbors < 5 else "#8A2BE2",
@@ -1,22 +1,37 @@
 import numpy as np
 from mesa import Model, Agent
-from mesa.space import ContinuousSpace
 from mesa.datacollection import DataCollector
 from mesa.visualization import SolaraViz, make_space_component, make_plot_component, Slider
-from sklearn.cluster import DBSCAN
+from scipy.spatial import cKDTree
+import multiprocessing as mp
+import os
 import random
 
+from agent_table import AgentTable
+from checkpoint import Checkpointer, dumps_checkpoint, loads_checkpoint
+from columnar_collector import ColumnarDataCollector
+from dbscan_backends import make_dbscan
+from detection_schedule import DetectionScheduler
+from incremental_dbscan import label_pairs
+from neighbor_snapshot import NeighborSnapshot
+from random_stream import RandomStream
+from spatial_hash import HashedContinuousSpace
+
 # 二维空间维度配置
 SPACE_DIMENSIONS = {
     'x_max': 200,  # 水平空间
     'y_max': 200,  # 垂直空间
 }
+# 非环形连续空间的上边界不可达，裁剪坐标时使用略小于边界的值
+POS_MAX = np.nextafter([SPACE_DIMENSIONS['x_max'], SPACE_DIMENSIONS['y_max']], 0)
+# 代理邻居查询的最大半径，批量邻居快照按此半径构建
+MAX_NEIGHBOR_RADIUS = 15
 
 class OriginalPostAgent(Agent):
     """原始帖子，固定在随机位置"""
     def __init__(self, model):
         super().__init__(model)
-        self.likes = np.random.randint(1, 10)  # 初始点赞数
+        self.likes = int(model.rng.integers(1, 10))  # 初始点赞数
         self.heat = 1.0  # 初始热度
 
     def step(self):
@@ -24,12 +39,13 @@ class OriginalPostAgent(Agent):
         self.heat = max(1.0, self.heat * 0.95)
         
         # 统计周围的广告机器人和水军数量来增加热度
-        neighbors = self.model.space.get_neighbors(self.pos, 5)
-        bots = [a for a in neighbors if isinstance(a, (AdBotAgent, ShillBotAgent))]
+        counts = self.model.count_neighbors_by_type(self, 5)
+        shills = counts.get(ShillBotAgent, 0)
+        bots = counts.get(AdBotAgent, 0) + shills
         
         # 热度增长与bot数量和平台热度修饰符相关
-        self.heat += len(bots) * 0.1 * self.model.heat_modifier
-        self.likes += len([a for a in neighbors if isinstance(a, ShillBotAgent)]) // 3  # 水军点赞
+        self.heat += bots * 0.1 * self.model.heat_modifier
+        self.likes += shills // 3  # 水军点赞
 
 
 class AdBotAgent(Agent):
@@ -43,12 +59,11 @@ class AdBotAgent(Agent):
     
     def find_target(self):
         """寻找周围点赞最高的帖子作为目标"""
-        neighbors = self.model.space.get_neighbors(self.pos, 10)
-        posts = [agent for agent in neighbors if isinstance(agent, OriginalPostAgent)]
+        posts = self.model.get_neighbors(self, 10, OriginalPostAgent)
         
         if posts:
             # 根据点赞数和热度寻找目标
-            weights = [post.likes * post.heat * np.random.rand() for post in posts]
+            weights = [post.likes * post.heat * self.model.random_stream.random() for post in posts]
             self.target_post = posts[np.argmax(weights)]
             return True
         return False
@@ -56,10 +71,10 @@ class AdBotAgent(Agent):
     def move(self):
         if self.attached:
             # 已附着到帖子，小范围随机移动模拟评论区位置
-            offset = np.random.uniform(-1, 1, 2)
+            offset = self.model.random_stream.uniform(-1, 1, 2)
             new_pos = np.array(self.pos) + offset
             # Add boundary check
-            new_pos = np.clip(new_pos, [0, 0], [SPACE_DIMENSIONS['x_max'], SPACE_DIMENSIONS['y_max']])
+            new_pos = np.clip(new_pos, [0, 0], POS_MAX)
             self.model.space.move_agent(self, tuple(new_pos))
         elif self.target_post:
             # 向目标帖子移动
@@ -72,18 +87,17 @@ class AdBotAgent(Agent):
                 direction = target_vec / distance
                 new_pos = np.array(self.pos) + direction * self.speed
                 # Add boundary check
-                new_pos = np.clip(new_pos, [0, 0], [SPACE_DIMENSIONS['x_max'], SPACE_DIMENSIONS['y_max']])
+                new_pos = np.clip(new_pos, [0, 0], POS_MAX)
                 self.model.space.move_agent(self, tuple(new_pos))
         else:
             # 随机游走
-            new_pos = np.array(self.pos) + np.random.uniform(-2, 2, 2)
-            new_pos = np.clip(new_pos, [0, 0], [SPACE_DIMENSIONS['x_max'], SPACE_DIMENSIONS['y_max']])
+            new_pos = np.array(self.pos) + self.model.random_stream.uniform(-2, 2, 2)
+            new_pos = np.clip(new_pos, [0, 0], POS_MAX)
             self.model.space.move_agent(self, tuple(new_pos))
     
     def step(self):
         # 更新集群大小（用于可视化）
-        neighbors = self.model.space.get_neighbors(self.pos, 5)
-        self.cluster_size = 1 + len([a for a in neighbors if isinstance(a, AdBotAgent)])
+        self.cluster_size = 1 + self.model.count_neighbors(self, 5, AdBotAgent)
         
         # 如果未附着且无目标，寻找目标
         if not self.attached and not self.target_post:
@@ -94,7 +108,7 @@ class AdBotAgent(Agent):
         
         # 检测是否被平台发现（基于detection强度和集群大小）
         detection_probability = self.model.detection_intensity * (0.05 + 0.02 * self.cluster_size)
-        if np.random.random() < detection_probability:
+        if self.model.random_stream.random() < detection_probability:
             self.model.remove_agent(self)
 
 
@@ -106,18 +120,18 @@ class ShillBotAgent(Agent):
         self.target = None  # 可以是AdBot或OriginalPost
     
     def find_target(self):
-        neighbors = self.model.space.get_neighbors(self.pos, 15)
+        model = self.model
         
         # 优先跟随广告机器人
-        ad_bots = [a for a in neighbors if isinstance(a, AdBotAgent) and a.attached]
+        ad_bots = [a for a in model.get_neighbors(self, 15, AdBotAgent) if a.attached]
         if ad_bots:
-            self.target = self.model.random.choice(ad_bots)
+            self.target = model.random.choice(ad_bots)
             return True
         
         # 其次寻找热门帖子
-        posts = [a for a in neighbors if isinstance(a, OriginalPostAgent) and a.heat > 2]
+        posts = [a for a in model.get_neighbors(self, 15, OriginalPostAgent) if a.heat > 2]
         if posts:
-            self.target = self.model.random.choice(posts)
+            self.target = model.random.choice(posts)
             return True
             
         return False
@@ -131,35 +145,37 @@ class ShillBotAgent(Agent):
             # 如果距离适中，添加一些随机游走以形成群体行为
             if distance < 8:
                 direction = target_vec / max(distance, 0.1)
-                random_offset = np.random.uniform(-1, 1, 2)
+                random_offset = self.model.random_stream.uniform(-1, 1, 2)
                 new_pos = np.array(self.pos) + direction * self.speed * 0.5 + random_offset
             else:
                 direction = target_vec / max(distance, 0.1)
                 new_pos = np.array(self.pos) + direction * self.speed
                 
             # 确保在空间范围内
-            new_pos = np.clip(new_pos, [0, 0], [SPACE_DIMENSIONS['x_max'], SPACE_DIMENSIONS['y_max']])
+            new_pos = np.clip(new_pos, [0, 0], POS_MAX)
             self.model.space.move_agent(self, tuple(new_pos))
         else:
             # 随机游走
-            new_pos = np.array(self.pos) + np.random.uniform(-1.5, 1.5, 2)
-            new_pos = np.clip(new_pos, [0, 0], [SPACE_DIMENSIONS['x_max'], SPACE_DIMENSIONS['y_max']])
+            new_pos = np.array(self.pos) + self.model.random_stream.uniform(-1.5, 1.5, 2)
+            new_pos = np.clip(new_pos, [0, 0], POS_MAX)
             self.model.space.move_agent(self, tuple(new_pos))
     
     def step(self):
+        # 目标已被平台移除时放弃该目标
+        if self.target is not None and self.target.pos is None:
+            self.target = None
         # 一定概率重新选择目标
-        if not self.target or np.random.random() < 0.05:
+        if not self.target or self.model.random_stream.random() < 0.05:
             self.find_target()
         
         self.move()
         
         # 检测是否被平台发现
         # 水军更难被发现，除非聚集得很明显
-        neighbors = self.model.space.get_neighbors(self.pos, 3)
-        shill_cluster = len([a for a in neighbors if isinstance(a, ShillBotAgent)])
+        shill_cluster = self.model.count_neighbors(self, 3, ShillBotAgent)
         
         detection_probability = self.model.detection_intensity * (0.01 + 0.03 * shill_cluster / 5)
-        if np.random.random() < detection_probability:
+        if self.model.random_stream.random() < detection_probability:
             self.model.remove_agent(self)
 
 
@@ -173,28 +189,27 @@ class UserAgent(Agent):
     
     def move(self):
         # 随机游走
-        new_pos = np.array(self.pos) + np.random.uniform(-2, 2, 2)
-        new_pos = np.clip(new_pos, [0, 0], [SPACE_DIMENSIONS['x_max'], SPACE_DIMENSIONS['y_max']])
+        new_pos = np.array(self.pos) + self.model.random_stream.uniform(-2, 2, 2)
+        new_pos = np.clip(new_pos, [0, 0], POS_MAX)
         self.model.space.move_agent(self, tuple(new_pos))
     
     def update_engagement(self):
         # 查看周围的帖子和广告
-        neighbors = self.model.space.get_neighbors(self.pos, 8)
-        posts = [a for a in neighbors if isinstance(a, OriginalPostAgent)]
-        bots = [a for a in neighbors if isinstance(a, (AdBotAgent, ShillBotAgent))]
+        counts = self.model.count_neighbors_by_type(self, 8)
         
-        if not posts:
+        if not counts.get(OriginalPostAgent):
             return
         
         # 如果周围有帖子，增加参与度
         self.engagement += 1
         
         # 如果周围有很多广告和水军，可能被欺骗
-        bot_ratio = len(bots) / max(1, len(neighbors))
+        bots = counts.get(AdBotAgent, 0) + counts.get(ShillBotAgent, 0)
+        bot_ratio = bots / max(1, sum(counts.values()))
         
         # 欺骗概率与bot比例、信任度有关
         deception_probability = bot_ratio * self.trust
-        if np.random.random() < deception_probability:
+        if self.model.random_stream.random() < deception_probability:
             self.deceived += 1
             self.engagement += 2  # 被欺骗会有更多互动
             self.trust *= 0.95    # 信任度略微下降
@@ -206,6 +221,22 @@ class UserAgent(Agent):
         self.update_engagement()
 
 
+# 列式存储（structure of arrays）时各类代理的列
+# target_id 为目标代理的 unique_id（从 1 开始编号，0 表示没有目标），只在向量化模式下使用；
+# target_kind 区分水军的目标类型：0 无目标，1 广告机器人，2 帖子
+AGENT_COLUMNS = {
+    OriginalPostAgent: {"pos": (float, 2), "unique_id": int, "likes": int, "heat": float},
+    AdBotAgent: {
+        "pos": (float, 2), "unique_id": int, "speed": float, "attached": bool,
+        "cluster_size": int, "target_id": int,
+    },
+    ShillBotAgent: {
+        "pos": (float, 2), "unique_id": int, "speed": float, "target_id": int, "target_kind": int,
+    },
+    UserAgent: {"pos": (float, 2), "engagement": int, "trust": float, "deceived": int},
+}
+
+
 class RandomActivationByType:
     """A scheduler that activates each type of agent once per step, in random order."""
     def __init__(self, model):
@@ -234,6 +265,231 @@ class RandomActivationByType:
         self.time += 1
 
 
+def _count_within(points, others, radius):
+    """统计 points 中每个点 radius 范围内（含边界）others 中点的个数"""
+    if len(points) == 0 or len(others) == 0:
+        return np.zeros(len(points), dtype=np.int64)
+    return cKDTree(others).query_ball_point(points, radius, return_length=True, workers=-1)
+
+
+def _pairs_within(points, others, radius):
+    """返回距离在 radius 以内的所有点对 (i, j)，i 为 points 的下标，j 为 others 的下标"""
+    if len(points) == 0 or len(others) == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    pairs = cKDTree(points).sparse_distance_matrix(
+        cKDTree(others), radius, output_type="ndarray"
+    )
+    return pairs["i"], pairs["j"]
+
+
+def _best_per_row(rows, cols, weights):
+    """对每个出现的 row，返回权重最大的 col，结果为 (rows, cols)"""
+    if len(rows) == 0:
+        return rows, cols
+    best = np.full(rows.max() + 1, -np.inf)
+    np.maximum.at(best, rows, weights)
+    is_best = np.flatnonzero(weights == best[rows])
+    # 权重相同时取第一个
+    rows, first = np.unique(rows[is_best], return_index=True)
+    return rows, cols[is_best[first]]
+
+
+def _rows_of(ids, wanted):
+    """返回 unique_id 为 wanted 的代理在表中的行号，找不到时为 -1"""
+    if len(ids) == 0:
+        return np.full(len(wanted), -1, dtype=np.intp)
+    sorter = np.argsort(ids)
+    found = np.minimum(np.searchsorted(ids, wanted, sorter=sorter), len(ids) - 1)
+    rows = sorter[found]
+    return np.where(ids[rows] == wanted, rows, -1)
+
+
+class VectorizedActivationByType(RandomActivationByType):
+    """按类型激活代理，同一类型的所有代理用数组运算同时更新
+
+    需要模型使用列式存储（model.tables）。与 RandomActivationByType 逐个激活相比：
+    - 同一类型的代理同步更新，都基于该类型开始更新时的状态做决定
+    - 被平台发现的代理在该类型更新完后统一移除
+    - 随机数按数组从 model.rng 抽取
+    因此结果与逐个激活在统计意义上一致，但不逐位相同。
+    代理对象的 target_post / target 属性在此模式下不更新，目标保存在 target_id 列中。
+    """
+
+    def step(self):
+        model = self.model
+        tables = model.tables
+        posts = tables[OriginalPostAgent]
+        ad_bots = tables[AdBotAgent]
+        shills = tables[ShillBotAgent]
+        users = tables[UserAgent]
+        # 与 RandomActivationByType 相同，按代理类型加入的顺序激活
+        for agent_class in self.agents_by_type:
+            if agent_class is OriginalPostAgent:
+                self.step_posts(posts, ad_bots, shills)
+            elif agent_class is AdBotAgent:
+                self.step_ad_bots(ad_bots, posts)
+            elif agent_class is ShillBotAgent:
+                self.step_shills(shills, ad_bots, posts)
+            elif agent_class is UserAgent:
+                self.step_users(users, posts, ad_bots, shills)
+        # 位置直接写入了列中，通知空间重建索引
+        model.space.positions_changed()
+        self.steps += 1
+        self.time += 1
+
+    def remove_caught(self, table, probability):
+        """按概率移除被平台发现的代理"""
+        caught = np.flatnonzero(self.model.rng.random(len(table)) < probability)
+        for agent in [table.agents[i] for i in caught]:
+            self.model.remove_agent(agent)
+
+    def step_posts(self, posts, ad_bots, shills):
+        """对应 OriginalPostAgent.step"""
+        pos = posts.column("pos")
+        heat = posts.column("heat")
+        heat[:] = np.maximum(1.0, heat * 0.95)
+        num_ads = _count_within(pos, ad_bots.column("pos"), 5)
+        num_shills = _count_within(pos, shills.column("pos"), 5)
+        heat += (num_ads + num_shills) * 0.1 * self.model.heat_modifier
+        posts.column("likes")[:] += num_shills // 3
+
+    def step_ad_bots(self, ad_bots, posts):
+        """对应 AdBotAgent.step"""
+        pos = ad_bots.column("pos")
+        attached = ad_bots.column("attached")
+        target_id = ad_bots.column("target_id")
+        cluster_size = 1 + _count_within(pos, pos, 5)
+        ad_bots.column("cluster_size")[:] = cluster_size
+
+        jittering = np.flatnonzero(attached)
+        chasing = np.flatnonzero(~attached & (target_id != 0))
+        searching = np.flatnonzero(~attached & (target_id == 0))
+
+        # 未附着且无目标的机器人寻找周围点赞最高的帖子，找到目标的这一步不移动
+        post_pos = posts.column("pos")
+        rows, cols = _pairs_within(pos[searching], post_pos, 10)
+        weights = (
+            posts.column("likes")[cols] * posts.column("heat")[cols] * self.model.rng.random(len(cols))
+        )
+        rows, cols = _best_per_row(rows, cols, weights)
+        target_id[searching[rows]] = posts.column("unique_id")[cols]
+        walking = np.setdiff1d(searching, searching[rows])
+
+        new_pos = pos.copy()
+        # 已附着的机器人在评论区小范围随机移动
+        new_pos[jittering] += self.model.rng.uniform(-1, 1, (len(jittering), 2))
+        # 有目标的机器人向目标移动，足够接近时附着
+        target_rows = _rows_of(posts.column("unique_id"), target_id[chasing])
+        target_vec = post_pos[target_rows] - pos[chasing]
+        distance = np.linalg.norm(target_vec, axis=1)
+        arrived = distance < 2
+        attached[chasing[arrived]] = True
+        moving = ~arrived
+        direction = target_vec[moving] / distance[moving, None]
+        new_pos[chasing[moving]] += direction * ad_bots.column("speed")[chasing[moving], None]
+        # 没有找到目标的机器人随机游走
+        new_pos[walking] += self.model.rng.uniform(-2, 2, (len(walking), 2))
+        pos[:] = np.clip(new_pos, [0, 0], POS_MAX)
+
+        detection = self.model.detection_intensity * (0.05 + 0.02 * cluster_size)
+        self.remove_caught(ad_bots, detection)
+
+    def step_shills(self, shills, ad_bots, posts):
+        """对应 ShillBotAgent.step"""
+        n = len(shills)
+        pos = shills.column("pos")
+        target_id = shills.column("target_id")
+        target_kind = shills.column("target_kind")
+        ad_ids = ad_bots.column("unique_id")
+
+        # 目标广告机器人已被平台移除时放弃该目标
+        following = np.flatnonzero(target_kind == 1)
+        lost = following[_rows_of(ad_ids, target_id[following]) < 0]
+        target_id[lost] = 0
+        target_kind[lost] = 0
+
+        # 无目标或以一定概率重新选择目标：优先跟随已附着的广告机器人，其次热门帖子
+        choosing = np.flatnonzero((target_kind == 0) | (self.model.rng.random(n) < 0.05))
+        candidates = (
+            (ad_bots, 1, np.flatnonzero(ad_bots.column("attached"))),
+            (posts, 2, np.flatnonzero(posts.column("heat") > 2)),
+        )
+        for table, kind, eligible in candidates:
+            rows, cols = _pairs_within(pos[choosing], table.column("pos")[eligible], 15)
+            # 在候选中均匀随机选择
+            rows, cols = _best_per_row(rows, cols, self.model.rng.random(len(cols)))
+            chosen = choosing[rows]
+            target_id[chosen] = table.column("unique_id")[eligible[cols]]
+            target_kind[chosen] = kind
+            choosing = np.setdiff1d(choosing, chosen)
+
+        new_pos = pos.copy()
+        speed = shills.column("speed")
+        for table, kind in ((ad_bots, 1), (posts, 2)):
+            chasing = np.flatnonzero(target_kind == kind)
+            target_rows = _rows_of(table.column("unique_id"), target_id[chasing])
+            target_vec = table.column("pos")[target_rows] - pos[chasing]
+            distance = np.linalg.norm(target_vec, axis=1)
+            direction = target_vec / np.maximum(distance, 0.1)[:, None]
+            # 距离适中时加入随机游走以形成群体行为
+            near = distance < 8
+            step = np.where(near, 0.5, 1.0) * speed[chasing]
+            new_pos[chasing] += direction * step[:, None]
+            new_pos[chasing[near]] += self.model.rng.uniform(-1, 1, (near.sum(), 2))
+        wandering = np.flatnonzero(target_kind == 0)
+        new_pos[wandering] += self.model.rng.uniform(-1.5, 1.5, (len(wandering), 2))
+        pos[:] = np.clip(new_pos, [0, 0], POS_MAX)
+
+        # 水军更难被发现，除非聚集得很明显
+        shill_cluster = _count_within(pos, pos, 3)
+        detection = self.model.detection_intensity * (0.01 + 0.03 * shill_cluster / 5)
+        self.remove_caught(shills, detection)
+
+    def step_users(self, users, posts, ad_bots, shills):
+        """对应 UserAgent.step"""
+        n = len(users)
+        pos = users.column("pos")
+        pos[:] = np.clip(pos + self.model.rng.uniform(-2, 2, (n, 2)), [0, 0], POS_MAX)
+
+        # 查看周围的帖子和广告，只有周围有帖子的用户参与
+        num_posts = _count_within(pos, posts.column("pos"), 8)
+        bots = _count_within(pos, ad_bots.column("pos"), 8) + _count_within(pos, shills.column("pos"), 8)
+        total = num_posts + bots + _count_within(pos, pos, 8)
+        engaged = num_posts > 0
+
+        engagement = users.column("engagement")
+        deceived = users.column("deceived")
+        trust = users.column("trust")
+        engagement[engaged] += 1
+        deception_probability = bots / np.maximum(1, total) * trust
+        fooled = engaged & (self.model.rng.random(n) < deception_probability)
+        deceived[fooled] += 1
+        engagement[fooled] += 2
+        trust[fooled] *= 0.95
+        trusting = engaged & ~fooled
+        trust[trusting] = np.minimum(1.0, trust[trusting] * 1.01)
+
+
+# fork() 的快照，在创建进程池前设置，子进程通过 fork 写时复制继承，不必逐个任务传输
+_FORK_SNAPSHOT = None
+
+
+def _run_branch(task):
+    """在工作进程中恢复快照，应用修改并运行一个分支"""
+    overrides, steps, seed = task
+    model = loads_checkpoint(_FORK_SNAPSHOT)
+    # 各分支不写检查点，否则会覆盖原模型目录中的检查点
+    model.checkpointer = None
+    if seed is not None:
+        model.reseed(seed)
+    for name, value in overrides.items():
+        setattr(model, name, value)
+    for _ in range(steps):
+        model.step()
+    return dumps_checkpoint(model)
+
+
 class SocialMediaModel(Model):
     """社交媒体平台模型"""
     def __init__(
@@ -243,12 +499,29 @@ class SocialMediaModel(Model):
         num_shills=50,    # 水军机器人数
         num_users=100,    # 真实用户数
         detection=0.5,    # 平台检测强度
+        batched_neighbors=False,  # 每步一次性计算所有代理的邻居
+        columnar=False,   # 代理的属性按列存储在 NumPy 数组中
+        vectorized=False,  # 每类代理用数组运算同时更新，需要列式存储
+        seed=None,        # 随机种子，模型的所有随机数都取自由它决定的生成器
+        cluster_backend="incremental",  # 聚类引擎："incremental"、"grid" 或 "sklearn"，结果相同
+        detection_interval=1,  # 每隔多少步做一次集群检测
+        adaptive_detection=False,  # 机器人密度升高时缩短检测间隔
+        async_detection=False,  # 聚类在后台线程运行，与之后各步代理的移动同时进行
+        detection_lag=None,  # 后台检测的结果延迟几步生效，至少 1 步，默认 1 步
+        columnar_data=False,  # 收集的数据按列存入预先分配的 NumPy 数组，可导出为 Parquet
+        planned_steps=1000,  # 列式数据收集预先分配的步数，超出时自动扩容
+        checkpoint_dir=None,  # 检查点目录，为 None 时不写检查点
+        checkpoint_every=100,  # 每隔多少步写一次检查点
     ):
-        super().__init__()
-        self.space = ContinuousSpace(
+        super().__init__(seed=seed)
+        # 代理逐个抽取的随机数从 self.rng 按块预先生成
+        self.random_stream = RandomStream(self.rng)
+        # 带空间哈希的连续空间，桶大小与常用的邻居查询半径（3~15）相当
+        self.space = HashedContinuousSpace(
             SPACE_DIMENSIONS['x_max'],
             SPACE_DIMENSIONS['y_max'],
-            False  # 不使用环形空间
+            False,  # 不使用环形空间
+            cell_size=8,
         )
         
         self.num_op = num_op
@@ -258,9 +531,36 @@ class SocialMediaModel(Model):
         self.detection_intensity = detection
         self.heat_modifier = 1.0
         self.steps = 0  # 步数计数器
+        # 批量模式下，所有代理在一步内读取步开始时的位置快照（同步更新），
+        # 快照同时供 DBSCAN 聚类复用；默认逐个查询当前位置（异步更新）
+        self.batched_neighbors = batched_neighbors
+        self.vectorized = vectorized
+        self.neighbors = None
+        # 列式存储时每类代理一张表，代理对象只保存所在的行，
+        # 模型层代码可以通过 self.tables[cls].column(name) 一次更新整列
+        self.tables = {
+            agent_class: AgentTable(agent_class, columns)
+            for agent_class, columns in AGENT_COLUMNS.items()
+        } if columnar or vectorized else {}
+        # 机器人每步只移动少许，默认的增量引擎沿用上一步的邻居对，只重新计算移动了的机器人
+        self.cluster_detector = make_dbscan(cluster_backend, eps=8, min_samples=5)
+        # 检测调度：用检测的频率和延迟换取吞吐量
+        self.detection = DetectionScheduler(
+            self.prepare_clusters,
+            self.detect_clusters,
+            self.apply_clusters,
+            interval=detection_interval,
+            adaptive=adaptive_detection,
+            density=self.bot_density,
+            asynchronous=async_detection,
+            lag=detection_lag,
+        )
         
         # 创建调度器
-        self.schedule = RandomActivationByType(self)
+        if vectorized:
+            self.schedule = VectorizedActivationByType(self)
+        else:
+            self.schedule = RandomActivationByType(self)
         self.running = True
         
         # 创建各类代理
@@ -269,77 +569,172 @@ class SocialMediaModel(Model):
         self.create_shill_bots()
         self.create_users()
         
-        # 数据收集器
-        self.datacollector = DataCollector(
-            model_reporters={
-                "Active Ad Bots": lambda m: len([a for a in m.schedule.agents_by_type[AdBotAgent]]),
-                "Active Shill Bots": lambda m: len([a for a in m.schedule.agents_by_type[ShillBotAgent]]),
-                "User Engagement": lambda m: sum(a.engagement for a in m.schedule.agents_by_type[UserAgent]),
-                "User Deception": lambda m: sum(a.deceived for a in m.schedule.agents_by_type[UserAgent]),
-                "Average Post Heat": lambda m: np.mean([a.heat for a in m.schedule.agents_by_type[OriginalPostAgent]]) if any(isinstance(a, OriginalPostAgent) for a in m.schedule.agents) else 0
-            }
+        # 数据收集器，列式收集器与 Mesa 的 DataCollector 得到相同的 DataFrame
+        model_reporters = {
+            "Active Ad Bots": lambda m: len(m.schedule.agents_by_type.get(AdBotAgent, {})),
+            "Active Shill Bots": lambda m: len(m.schedule.agents_by_type.get(ShillBotAgent, {})),
+            "User Engagement": lambda m: np.sum(m.attribute_values(UserAgent, "engagement")),
+            "User Deception": lambda m: np.sum(m.attribute_values(UserAgent, "deceived")),
+            "Average Post Heat": lambda m: np.mean(m.attribute_values(OriginalPostAgent, "heat")) if m.schedule.agents_by_type.get(OriginalPostAgent) else 0
+        }
+        if columnar_data:
+            self.datacollector = ColumnarDataCollector(model_reporters, planned_steps)
+        else:
+            self.datacollector = DataCollector(model_reporters=model_reporters)
+        self.update_neighbors()
+        # 每 checkpoint_every 步写入检查点，崩溃后可用 checkpoint.load_checkpoint 恢复
+        self.checkpointer = (
+            Checkpointer(self, checkpoint_dir, every=checkpoint_every)
+            if checkpoint_dir is not None
+            else None
         )
     
     def create_original_posts(self):
         """创建原始帖子"""
         for i in range(self.num_op):
-            x = np.random.uniform(10, SPACE_DIMENSIONS['x_max']-10)
-            y = np.random.uniform(10, SPACE_DIMENSIONS['y_max']-10)
+            x = self.rng.uniform(10, SPACE_DIMENSIONS['x_max']-10)
+            y = self.rng.uniform(10, SPACE_DIMENSIONS['y_max']-10)
             post = OriginalPostAgent(self)
+            self.add_to_table(post)
             self.space.place_agent(post, (x, y))
             self.schedule.add(post)
     
     def create_ad_bots(self):
         """创建广告机器人"""
         for i in range(self.num_ads):
-            x = np.random.uniform(0, SPACE_DIMENSIONS['x_max'])
-            y = np.random.uniform(0, SPACE_DIMENSIONS['y_max'])
+            x = self.rng.uniform(0, SPACE_DIMENSIONS['x_max'])
+            y = self.rng.uniform(0, SPACE_DIMENSIONS['y_max'])
             bot = AdBotAgent(self)
+            self.add_to_table(bot)
             self.space.place_agent(bot, (x, y))
             self.schedule.add(bot)
     
     def create_shill_bots(self):
         """创建水军机器人"""
         for i in range(self.num_shills):
-            x = np.random.uniform(0, SPACE_DIMENSIONS['x_max'])
-            y = np.random.uniform(0, SPACE_DIMENSIONS['y_max'])
+            x = self.rng.uniform(0, SPACE_DIMENSIONS['x_max'])
+            y = self.rng.uniform(0, SPACE_DIMENSIONS['y_max'])
             bot = ShillBotAgent(self)
+            self.add_to_table(bot)
             self.space.place_agent(bot, (x, y))
             self.schedule.add(bot)
     
     def create_users(self):
         """创建真实用户"""
         for i in range(self.num_users):
-            x = np.random.uniform(0, SPACE_DIMENSIONS['x_max'])
-            y = np.random.uniform(0, SPACE_DIMENSIONS['y_max'])
+            x = self.rng.uniform(0, SPACE_DIMENSIONS['x_max'])
+            y = self.rng.uniform(0, SPACE_DIMENSIONS['y_max'])
             user = UserAgent(self)
+            self.add_to_table(user)
             self.space.place_agent(user, (x, y))
             self.schedule.add(user)
     
+    def add_to_table(self, agent):
+        """列式存储时将代理的属性移入其类型的表中"""
+        table = self.tables.get(type(agent))
+        if table is not None:
+            table.add(agent)
+    
     def remove_agent(self, agent):
         """从模型中移除代理"""
         self.space.remove_agent(agent)
         self.schedule.remove(agent)
+        table = self.tables.get(type(agent))
+        if table is not None:
+            table.remove(agent)
+        if self.neighbors is not None:
+            self.neighbors.discard(agent)
+    
+    def update_neighbors(self):
+        """批量模式下，根据所有代理的当前位置重建邻居快照"""
+        if self.batched_neighbors:
+            self.neighbors = NeighborSnapshot(self.space, MAX_NEIGHBOR_RADIUS)
+    
+    def _snapshot_of(self, agent):
+        """返回包含该代理的邻居快照，非批量模式或代理不在快照中时返回 None"""
+        snapshot = self.neighbors
+        if snapshot is not None and agent in snapshot:
+            return snapshot
+        return None
+    
+    def get_neighbors(self, agent, radius, agent_type=None):
+        """返回代理周围 radius 范围内的代理（包括代理自身）"""
+        snapshot = self._snapshot_of(agent)
+        if snapshot is not None:
+            return snapshot.get_neighbors(agent, radius, agent_type)
+        return self.space.get_neighbors(agent.pos, radius, agent_type=agent_type)
+    
+    def count_neighbors(self, agent, radius, agent_type=None):
+        """统计代理周围 radius 范围内的代理数（包括代理自身）"""
+        snapshot = self._snapshot_of(agent)
+        if snapshot is not None:
+            return snapshot.count_neighbors(agent, radius, agent_type)
+        return self.space.count_neighbors(agent.pos, radius, agent_type)
+    
+    def count_neighbors_by_type(self, agent, radius):
+        """按类型统计代理周围 radius 范围内的代理数（包括代理自身）"""
+        snapshot = self._snapshot_of(agent)
+        if snapshot is not None:
+            return snapshot.count_neighbors_by_type(agent, radius)
+        return self.space.count_neighbors_by_type(agent.pos, radius)
+    
+    def attribute_values(self, agent_class, name):
+        """返回某类所有代理的某个属性，列式存储时直接返回该列"""
+        table = self.tables.get(agent_class)
+        if table is not None:
+            return table.column(name)
+        return [getattr(a, name) for a in self.schedule.agents_by_type.get(agent_class, {}).values()]
     
     def analyze_clusters(self):
         """分析并处理可疑集群"""
-        # 从所有类型的代理中获取机器人
-        bots = []
-        for agent_class in self.schedule.agents_by_type:
-            if issubclass(agent_class, (AdBotAgent, ShillBotAgent)):
-                bots.extend(self.schedule.agents_by_type[agent_class].values())
+        frozen = self.prepare_clusters()
+        if frozen is not None:
+            self.apply_clusters(frozen, self.detect_clusters(frozen))
+    
+    def prepare_clusters(self):
+        """冻结聚类所需的输入：机器人及其位置的副本，机器人太少时返回 None"""
+        bot_positions = bot_ids = None
+        if self.vectorized:
+            # 向量化模式下按表中的行顺序取机器人，位置直接取自列
+            bot_tables = [self.tables[AdBotAgent], self.tables[ShillBotAgent]]
+            bots = [a for table in bot_tables for a in table.agents]
+            bot_positions = np.concatenate([table.column("pos") for table in bot_tables])
+            bot_ids = np.concatenate([table.column("unique_id") for table in bot_tables])
+        else:
+            # 从所有类型的代理中获取机器人
+            bots = []
+            for agent_class in self.schedule.agents_by_type:
+                if issubclass(agent_class, (AdBotAgent, ShillBotAgent)):
+                    bots.extend(self.schedule.agents_by_type[agent_class].values())
         
         if len(bots) <= 10:
-            return  # 太少机器人，不进行聚类
-            
-        bot_positions = np.array([(a.pos[0], a.pos[1]) for a in bots])
+            return None  # 太少机器人，不进行聚类
         
-        # 使用DBSCAN进行聚类分析
-        clustering = DBSCAN(eps=8, min_samples=5).fit(bot_positions)
+        if self.neighbors is not None:
+            # 复用邻居快照中距离在 eps 以内的机器人对，无需重新搜索邻居
+            return bots, self.neighbors.pairs_within(bots, self.cluster_detector.eps), None
+        if bot_positions is None:
+            bot_positions = np.array([(a.pos[0], a.pos[1]) for a in bots])
+            bot_ids = np.array([a.unique_id for a in bots])
+        return bots, bot_positions, bot_ids
+    
+    def detect_clusters(self, frozen):
+        """对冻结的输入做 DBSCAN 聚类，返回每个机器人的标签；不读写模型状态，可在后台线程运行"""
+        bots, data, bot_ids = frozen
+        if bot_ids is None:
+            # 快照已给出邻居对，只需由这些对求标签，结果与各聚类引擎相同
+            first, second = data
+            return label_pairs(len(bots), first, second, self.cluster_detector.min_samples)[0]
+        # 结果与 DBSCAN(eps=8, min_samples=5).fit(bot_positions) 完全相同
+        return self.cluster_detector.fit(data, bot_ids).labels_
+    
+    def apply_clusters(self, frozen, labels):
+        """根据聚类标签随机移除可疑集群中的机器人"""
+        bots = frozen[0]
         clusters = {}
         
         # 统计每个集群中的机器人
-        for i, label in enumerate(clustering.labels_):
+        for i, label in enumerate(labels):
             if label != -1:  # 忽略噪声点
                 if label not in clusters:
                     clusters[label] = []
@@ -352,26 +747,94 @@ class SocialMediaModel(Model):
                 # 大集群有更高的检测概率
                 detection_prob = self.detection_intensity * (0.2 + 0.01 * cluster_size)
                 
-                if np.random.random() < detection_prob:
+                if self.random_stream.random() < detection_prob:
                     # 找出集群中的所有机器人 
                     cluster_bots = [bots[i] for i in indices]
                     
-                    # 随机移除一部分
+                    # 随机移除一部分，异步检测时跳过聚类之后已被移除的机器人
                     for bot in self.random.sample(cluster_bots, int(cluster_size * 0.3)):
-                        self.remove_agent(bot)
+                        if bot.pos is not None:
+                            self.remove_agent(bot)
+    
+    def bot_density(self):
+        """每 100 单位面积上的机器人数"""
+        bots = sum(
+            len(agents)
+            for agent_class, agents in self.schedule.agents_by_type.items()
+            if issubclass(agent_class, (AdBotAgent, ShillBotAgent))
+        )
+        return 100 * bots / (SPACE_DIMENSIONS['x_max'] * SPACE_DIMENSIONS['y_max'])
     
+    def reseed(self, seed):
+        """用新的种子重置模型的所有随机数生成器"""
+        self.random.seed(seed)
+        self.rng = np.random.default_rng(seed)
+        self.random_stream = RandomStream(self.rng)
+    
+    def __getstate__(self):
+        """序列化前等待后台检测结束，否则聚类引擎可能在工作线程更新到一半时被序列化"""
+        self.detection.wait()
+        return self.__dict__.copy()
+
     def update_heat_modifier(self):
         """更新热度修饰符"""
         # 简单的热度波动模式
         self.heat_modifier = 1.0 + 0.3 * np.sin(self.steps / 10)
     
+    def fork(self, n, overrides=None, steps=0, seeds=None, processes=None):
+        """从当前状态克隆出 n 个分支，并在工作进程中并行运行
+
+        当前状态只序列化一次。支持 fork 启动方式的平台上，子进程以写时复制方式共享该快照；
+        否则（或 processes=1 时）在本进程内依次运行各分支。
+
+        Args:
+            n: 分支数
+            overrides: 分支要修改的模型属性，可以是应用于所有分支的字典，也可以是 n 个字典的列表，
+                例如 [{"detection_intensity": d} for d in (0.2, 0.5, 0.8)]
+            steps: 每个分支运行的步数
+            seeds: n 个随机种子；为 None 时所有分支沿用当前的随机状态（共同随机数）
+            processes: 工作进程数，默认为 min(n, CPU 核数)
+
+        Returns:
+            运行后的 n 个分支模型，原模型不受影响
+        """
+        global _FORK_SNAPSHOT
+        if overrides is None:
+            overrides = {}
+        if isinstance(overrides, dict):
+            overrides = [overrides] * n
+        if seeds is None:
+            seeds = [None] * n
+        if len(overrides) != n or len(seeds) != n:
+            raise ValueError("overrides and seeds must have one entry per branch")
+
+        tasks = [(dict(o), steps, s) for o, s in zip(overrides, seeds)]
+        processes = processes or min(n, os.cpu_count() or 1)
+        random_state, np_random_state = random.getstate(), np.random.get_state()
+        _FORK_SNAPSHOT = dumps_checkpoint(self)
+        try:
+            if processes > 1 and "fork" in mp.get_all_start_methods():
+                with mp.get_context("fork").Pool(processes) as pool:
+                    results = pool.map(_run_branch, tasks, chunksize=1)
+            else:
+                results = [_run_branch(task) for task in tasks]
+        finally:
+            _FORK_SNAPSHOT = None
+            # 顺序运行的分支会改变全局随机状态，恢复为分叉时的状态
+            random.setstate(random_state)
+            np.random.set_state(np_random_state)
+        return [loads_checkpoint(result, restore_global_random=False) for result in results]
+
     def step(self):
         """执行模型单步"""
         self.steps += 1
         self.update_heat_modifier()
         self.schedule.step()
-        self.analyze_clusters()
+        self.update_neighbors()
+        self.detection.step()
         self.datacollector.collect(self)
+        if self.checkpointer is not None:
+            self.checkpointer.step()
 
 
 # 可视化设置
@@ -395,7 +858,7 @@ def agent_portrayal(agent):
         }
     
     elif isinstance(agent, ShillBotAgent):
-        neighbors = len(agent.model.space.get_neighbors(agent.pos, 5))
+        neighbors = agent.model.count_neighbors(agent, 5)
         return {
             "marker": "^",
             "color": "#00FF00" if neighbors < 5 else "#8A2BE2",
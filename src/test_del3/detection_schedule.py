@@ -0,0 +1,188 @@
+"""When the platform audits for bots, and where the audits run.
+
+The bot detectors of the demos cluster all bot positions, which is the most
+expensive part of a step. A `DetectionScheduler` decides at which steps an audit
+runs, and runs it:
+- at a fixed interval, every ``interval`` steps, every step by default
+- adaptively, the interval shrinks, down to ``min_interval``, as the bot density
+  rises above the density at the first audit
+- asynchronously, the clustering runs on a worker thread while the model goes on,
+  and its result is applied ``lag`` steps later, one step by default
+
+An audit is split in three parts so that the clustering can leave the model thread:
+``prepare()`` freezes the input on the model thread, e.g. copies the bot positions,
+``detect(frozen)`` computes on the frozen input only, and ``apply(frozen, result)``
+acts on the result on the model thread, e.g. removes bots. All random numbers are
+drawn in ``apply``, so a seeded model stays reproducible in every mode. An
+asynchronous audit sees the positions at the end of the step it was started in.
+
+With a ``lag`` of k the audit started in step t is applied at the audit of step
+t + k, after the agents of steps t + 1 to t + k have moved, so the clustering runs
+while they move. A lag of zero would make the next step wait for the clustering
+before any agent moves, so asynchronous audits need a lag of at least one step.
+Bots removed in the meantime are skipped by ``apply``. Audits run one after the
+other on a single worker, in the order they were started, as the clustering
+engines keep state between calls; results are always applied in the same order
+and at the same step, however long the clustering takes, so runs are reproducible
+for every lag.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+
+class _Finished:
+    """The result of an audit that was waited for, in place of its future."""
+
+    def __init__(self, result: Any) -> None:
+        self._result = result
+
+    def result(self) -> Any:
+        """Return the result, like `Future.result`."""
+        return self._result
+
+
+class DetectionScheduler:
+    """Runs the audits of a detector at a configurable cadence.
+
+    Attributes:
+        interval (int): the number of steps between audits
+        adaptive (bool): whether the interval shrinks as the bot density rises
+        min_interval (int): the smallest interval of adaptive scheduling
+        asynchronous (bool): whether audits run on a worker thread
+        lag (int): the number of steps before the result of an asynchronous audit is applied
+        steps (int): the number of steps so far
+        audits (int): the number of audits started so far
+        last_audit (int): the step of the last audit
+
+    """
+
+    def __init__(
+        self,
+        prepare: Callable[[], Any],
+        detect: Callable[[Any], Any],
+        apply: Callable[[Any, Any], None],
+        interval: int = 1,
+        adaptive: bool = False,
+        density: Callable[[], float] | None = None,
+        min_interval: int = 1,
+        asynchronous: bool = False,
+        lag: int | None = None,
+    ) -> None:
+        """Create a scheduler.
+
+        Args:
+            prepare: returns the frozen input of an audit, or None if there is nothing to audit
+            detect: computes the result of an audit from its frozen input, must not touch the model
+            apply: acts on the result of an audit, called with the frozen input and the result
+            interval: the number of steps between audits
+            adaptive: shrink the interval as the density rises above its value at the first audit
+            density: returns the current bot density, required for adaptive scheduling
+            min_interval: the smallest interval of adaptive scheduling
+            asynchronous: run detect on a worker thread and apply its result lag steps later
+            lag: apply the result of an asynchronous audit at the audit of lag steps later,
+                at least one, None for one step
+        """
+        if interval < 1 or min_interval < 1:
+            raise ValueError("intervals must be at least one step")
+        if lag is None:
+            lag = 1 if asynchronous else 0
+        if lag < 0:
+            raise ValueError("lag cannot be negative")
+        if asynchronous and lag == 0:
+            raise ValueError(
+                "asynchronous audits need a lag of at least one step, "
+                "with no lag the next step waits for the clustering"
+            )
+        if adaptive and density is None:
+            raise ValueError("adaptive scheduling needs a density")
+        self.prepare = prepare
+        self.detect = detect
+        self.apply = apply
+        self.interval = interval
+        self.adaptive = adaptive
+        self.density = density
+        self.min_interval = min(min_interval, interval)
+        self.asynchronous = asynchronous
+        self.lag = lag
+        self.steps = 0
+        self.audits = 0
+        self.last_audit = 0
+
+        self._reference_density: float | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        # step to apply at, frozen input and result of the audits still to be applied
+        self._pending: deque[tuple[int, Any, Future | _Finished]] = deque()
+
+    def current_interval(self) -> int:
+        """Return the number of steps between audits at the current bot density."""
+        if not self.adaptive:
+            return self.interval
+        density = self.density()
+        if self._reference_density is None:
+            self._reference_density = density
+        if density <= self._reference_density or density <= 0:
+            return self.interval
+        # twice the density, audits twice as often
+        interval = int(self.interval * self._reference_density / density)
+        return max(self.min_interval, interval)
+
+    def due(self) -> bool:
+        """Return whether an audit is due at the current step."""
+        return self.steps - self.last_audit >= self.current_interval()
+
+    def step(self) -> None:
+        """Advance one step and run, or start on the worker, its audit if it is due."""
+        self.steps += 1
+        self.apply_pending()
+        if not self.due():
+            return
+        self.last_audit = self.steps
+        frozen = self.prepare()
+        if frozen is None:
+            return
+        self.audits += 1
+        if self.asynchronous:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detection")
+            future = self._executor.submit(self.detect, frozen)
+            self._pending.append((self.steps + self.lag, frozen, future))
+        else:
+            self.apply(frozen, self.detect(frozen))
+
+    def apply_pending(self) -> None:
+        """Wait for the audits that are due by the current step and apply their results."""
+        pending = self._pending
+        while pending and pending[0][0] <= self.steps:
+            _, frozen, future = pending.popleft()
+            self.apply(frozen, future.result())
+
+    def wait(self) -> None:
+        """Wait for the running audits to finish, without applying their results.
+
+        Call this before pickling anything a running audit may still change, e.g.
+        the clustering engine, which the worker updates while it clusters.
+        """
+        self._pending = deque(
+            (due, frozen, _Finished(future.result())) for due, frozen, future in self._pending
+        )
+
+    def close(self) -> None:
+        """Apply all pending audits and stop the worker thread."""
+        while self._pending:
+            _, frozen, future = self._pending.popleft()
+            self.apply(frozen, future.result())
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __getstate__(self) -> dict:
+        """Return the state for pickling, running audits are waited for."""
+        self.wait()
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
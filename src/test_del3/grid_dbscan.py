@@ -0,0 +1,146 @@
+"""DBSCAN on a uniform grid with cells of size eps, in NumPy.
+
+With cells of size ``eps``, every point within ``eps`` of a point lies in the cell
+of the point or in one of the cells around it, 3 x 3 cells in the plane. Sorting
+the points by cell makes every cell a contiguous range of points, so the candidate
+pairs of all points can be listed with a few vectorized range expansions, and their
+distances measured at once. Every pair is listed once: a point is paired with the
+points after it in its own cell and with the points in the cells that follow its
+cell, half of the cells around it.
+
+The detectors of the demos cluster with a constant eps, so the grid needs no
+tuning, and a fit has none of the per-call validation of `sklearn.cluster.DBSCAN`.
+Labels are identical to ``DBSCAN(eps, min_samples).fit(positions).labels_``.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+
+import numpy as np
+
+from incremental_dbscan import label_pairs
+
+
+class GridDBSCAN:
+    """DBSCAN clustering with a uniform grid neighbor search.
+
+    Attributes:
+        eps (float): the maximum distance between two neighboring points
+        min_samples (int): the number of points within eps, including the point
+            itself, for a point to be a core point
+        labels_ (np.ndarray): cluster label of every point of the last call, -1 for noise
+        core_sample_indices_ (np.ndarray): indices of the core points of the last call
+
+    """
+
+    def __init__(self, eps: float = 0.5, min_samples: int = 5) -> None:
+        """Create a clustering engine.
+
+        Args:
+            eps: the maximum distance between two neighboring points, the size of the cells
+            min_samples: the number of points within eps, including the point itself,
+                for a point to be a core point
+        """
+        if eps <= 0:
+            raise ValueError("eps must be positive")
+        self.eps = eps
+        self.min_samples = min_samples
+        self.labels_ = np.zeros(0, dtype=np.intp)
+        self.core_sample_indices_ = np.zeros(0, dtype=np.intp)
+
+    def fit(self, positions: np.ndarray, ids: np.ndarray | None = None) -> GridDBSCAN:
+        """Cluster the points.
+
+        Args:
+            positions: (n, d) array with the coordinates of the points
+            ids: ignored, accepted so that the engines can be used interchangeably
+
+        Returns:
+            the engine itself, with labels_ and core_sample_indices_ set
+
+        """
+        positions = np.asarray(positions, dtype=float)
+        n = len(positions)
+        if n == 0:
+            self.labels_ = np.zeros(0, dtype=np.intp)
+            self.core_sample_indices_ = np.zeros(0, dtype=np.intp)
+            return self
+
+        order, candidates, second = self._pairs(positions)
+        points = positions[order]
+        distance2 = np.zeros(len(second))
+        for axis in points.T:
+            # the first points of the pairs are runs, repeating is cheaper than gathering
+            delta = np.repeat(axis, candidates) - axis[second]
+            distance2 += delta * delta
+        within = distance2 <= self.eps**2
+
+        first = np.repeat(np.arange(n, dtype=np.int32), candidates)
+        labels, self.core_sample_indices_ = label_pairs(
+            n, first[within], second[within], self.min_samples, index=order
+        )
+        self.labels_ = np.empty(n, dtype=np.intp)
+        self.labels_[order] = labels
+        return self
+
+    def fit_predict(self, positions: np.ndarray, ids: np.ndarray | None = None) -> np.ndarray:
+        """Cluster the points and return their labels."""
+        return self.fit(positions, ids).labels_
+
+    def _pairs(self, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the order of the points by cell and the candidate pairs in that order.
+
+        Returns:
+            the order of the points, the number of candidates of every point in that
+            order, and the second point of every candidate pair; the pairs are sorted
+            by their first and then by their second point
+
+        """
+        n, dimensions = positions.shape
+        # a border of empty cells keeps the cells around every point inside the grid
+        cells = np.floor((positions - positions.min(axis=0)) / self.eps).astype(np.int64) + 1
+        key = self._cell_key(cells.max(axis=0) + 2)
+        keys = key(cells)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        cell_keys, starts, sizes = np.unique(keys, return_index=True, return_counts=True)
+        cell = np.repeat(np.arange(len(cell_keys)), sizes)
+
+        # the cells following a cell, in increasing order of their keys: the offsets
+        # after the cell itself in lexicographic order
+        offsets = np.array(list(itertools.product((-1, 0, 1), repeat=dimensions)))
+        offsets = offsets[len(offsets) // 2 + 1 :]
+        neighbor_keys = key(cells[order][starts][:, None, :] + offsets)
+
+        # range of candidate points per point and cell, the own cell first
+        low = np.empty((n, len(offsets) + 1), dtype=np.int64)
+        high = np.empty_like(low)
+        low[:, 0] = np.arange(1, n + 1)
+        high[:, 0] = (starts + sizes)[cell]
+        found = np.minimum(np.searchsorted(cell_keys, neighbor_keys), len(cell_keys) - 1)
+        exists = cell_keys[found] == neighbor_keys
+        low[:, 1:] = np.where(exists, starts[found], 0)[cell]
+        high[:, 1:] = np.where(exists, (starts + sizes)[found], 0)[cell]
+
+        # expand all ranges at once
+        counts = (high - low).ravel()
+        total = counts.sum()
+        skip = np.repeat(low.ravel() - (np.cumsum(counts) - counts), counts)
+        second = (skip + np.arange(total)).astype(np.int32)
+        return order, (high - low).sum(axis=1), second
+
+    @staticmethod
+    def _cell_key(shape: np.ndarray):
+        """Return a function mapping cells to keys that sort like the cells, lexicographically.
+
+        The key is the index of the cell in a dense grid of the given shape if that
+        fits in an int64, else the big endian bytes of the cell, so that points spread
+        over a vast area need no dense grid.
+        """
+        if math.prod(int(size) for size in shape) < np.iinfo(np.int64).max:
+            strides = np.r_[np.cumprod(shape[::-1])[:-1][::-1], 1]
+            return lambda cells: cells @ strides
+        width = np.dtype((np.void, 8 * len(shape)))
+        return lambda cells: np.ascontiguousarray(cells, dtype=">i8").view(width)[..., 0]
@@ -0,0 +1,265 @@
+"""DBSCAN for points that move a little between successive clusterings.
+
+Models that detect bot clusters every step refit `sklearn.cluster.DBSCAN` from
+scratch, although bots only move a few units per step. `IncrementalDBSCAN` keeps
+the work of the neighbor search between calls with a Verlet list: it stores all
+pairs of points within ``eps + skin`` of each other together with the positions
+at the time the list was built. As long as no point has moved more than
+``skin / 2`` since then, every pair that is now within ``eps`` is guaranteed to be
+in the list, so a call only recomputes the distances of the listed pairs. The
+list is rebuilt with a KD-tree when a point moved too far or a new point appears,
+points that disappear are simply dropped from it. A list that has to be rebuilt
+on the very next call only costs the extra pairs of the skin, so after such a list
+the next few are built without skin.
+
+Between rebuilds only the pairs with a point that moved since the previous call
+are measured again, the others keep whether they are within ``eps``.
+
+Core points and clusters are derived from the pairs within ``eps`` with a sparse
+connected components pass. Clusters are numbered, and border points assigned,
+exactly like sklearn does: clusters in the order of their first core point, and
+border points to the first cluster that reaches them. The labels are therefore
+identical to ``DBSCAN(eps, min_samples).fit(positions).labels_``.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+
+class IncrementalDBSCAN:
+    """DBSCAN clustering that reuses its neighbor search between calls.
+
+    Points are identified by integer ids, e.g. the unique ids of agents, so that
+    points can be followed between calls even if their order changes.
+
+    Attributes:
+        eps (float): the maximum distance between two neighboring points
+        min_samples (int): the number of points within eps, including the point
+            itself, for a point to be a core point
+        skin (float): the extra distance of the stored pairs, points can move skin / 2
+            before the pairs have to be searched again
+        labels_ (np.ndarray): cluster label of every point of the last call, -1 for noise
+        core_sample_indices_ (np.ndarray): indices of the core points of the last call
+        rebuilds (int): number of times the pairs were searched from scratch
+
+    """
+
+    def __init__(self, eps: float = 0.5, min_samples: int = 5, skin: float | None = None) -> None:
+        """Create a clustering engine.
+
+        Args:
+            eps: the maximum distance between two neighboring points
+            min_samples: the number of points within eps, including the point itself,
+                for a point to be a core point
+            skin: the extra distance of the stored pairs, defaults to eps / 2
+        """
+        if eps <= 0:
+            raise ValueError("eps must be positive")
+        self.eps = eps
+        self.min_samples = min_samples
+        self.skin = eps / 2 if skin is None else skin
+        self.labels_ = np.zeros(0, dtype=np.intp)
+        self.core_sample_indices_ = np.zeros(0, dtype=np.intp)
+        self.rebuilds = 0
+
+        self._ids: np.ndarray | None = None
+        # positions of the points when the pairs were searched, and at the last call
+        self._reference: np.ndarray | None = None
+        self._last: np.ndarray | None = None
+        # the stored pairs as two index arrays, sorted by first and then by second,
+        # and whether each pair was within eps at the last call
+        self._first = np.zeros(0, dtype=np.int32)
+        self._second = np.zeros(0, dtype=np.int32)
+        self._within = np.zeros(0, dtype=bool)
+        # the distance the points may move before the pairs have to be searched again
+        self._margin = 0.0
+        self._fits = 0
+        self._plain_rebuilds = 0
+
+    def fit(self, positions: np.ndarray, ids: np.ndarray) -> IncrementalDBSCAN:
+        """Cluster the points, reusing the pairs found in earlier calls where possible.
+
+        Args:
+            positions: (n, d) array with the coordinates of the points
+            ids: n unique integer ids of the points
+
+        Returns:
+            the engine itself, with labels_ and core_sample_indices_ set
+
+        """
+        positions = np.asarray(positions, dtype=float)
+        ids = np.asarray(ids)
+        if self._follow(positions, ids):
+            moved = (positions != self._last).any(axis=1)
+            if moved.mean() > 0.5:
+                self._within = self._measure(positions, self._first, self._second)
+            else:
+                measured = moved[self._first] | moved[self._second]
+                self._within[measured] = self._measure(
+                    positions, self._first[measured], self._second[measured]
+                )
+        else:
+            self._rebuild(positions, ids)
+            self._within = self._measure(positions, self._first, self._second)
+        self._fits += 1
+        self._last = positions.copy()
+
+        within = self._within
+        self.labels_, self.core_sample_indices_ = label_pairs(
+            len(ids), self._first[within], self._second[within], self.min_samples
+        )
+        return self
+
+    def fit_predict(self, positions: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """Cluster the points and return their labels."""
+        return self.fit(positions, ids).labels_
+
+    def _measure(self, positions: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """Return for every pair whether it is within eps."""
+        # gathering one coordinate at a time is faster than gathering rows
+        distance2 = np.zeros(len(first))
+        for axis in positions.T:
+            delta = axis[first] - axis[second]
+            distance2 += delta * delta
+        return distance2 <= self.eps**2
+
+    def _follow(self, positions: np.ndarray, ids: np.ndarray) -> bool:
+        """Carry the stored pairs over to the new order of the points.
+
+        Returns:
+            False if the pairs cannot be reused and have to be searched again
+
+        """
+        old_ids = self._ids
+        if old_ids is None or len(ids) == 0 or len(old_ids) == 0:
+            return False
+        unchanged = len(ids) == len(old_ids) and np.array_equal(ids, old_ids)
+        if unchanged:
+            reference = self._reference
+        else:
+            sorter = np.argsort(old_ids)
+            found = np.minimum(np.searchsorted(old_ids, ids, sorter=sorter), len(old_ids) - 1)
+            old_index = sorter[found]
+            if not (old_ids[old_index] == ids).all():
+                # new points were never checked against the others
+                return False
+            reference = self._reference[old_index]
+        moved = positions - reference
+        if np.einsum("ij,ij->i", moved, moved).max() > (self._margin / 2) ** 2:
+            return False
+        if unchanged:
+            return True
+
+        new_index = np.full(len(old_ids), -1, dtype=np.int32)
+        new_index[old_index] = np.arange(len(ids), dtype=np.int32)
+        first = new_index[self._first]
+        second = new_index[self._second]
+        kept = (first >= 0) & (second >= 0)
+        first, second, within = first[kept], second[kept], self._within[kept]
+        if not (np.diff(old_index) > 0).all():
+            # the points changed order, not only lost some of their number
+            order = self._order(first, second, len(ids))
+            first, second, within = first[order], second[order], within[order]
+        self._first, self._second, self._within = first, second, within
+        self._ids = ids.copy()
+        self._reference = reference
+        self._last = self._last[old_index]
+        return True
+
+    def _rebuild(self, positions: np.ndarray, ids: np.ndarray) -> None:
+        """Search all pairs of points within eps plus the skin."""
+        if self._ids is not None and self._fits == 1 and self._margin > 0:
+            # the skin of the last pairs was of no use
+            self._plain_rebuilds = 4
+        if self._plain_rebuilds:
+            self._plain_rebuilds -= 1
+            self._margin = 0.0
+        else:
+            self._margin = self.skin
+        self.rebuilds += 1
+        self._fits = 0
+        self._ids = ids.copy()
+        self._reference = positions.copy()
+        if len(positions) < 2:
+            pairs = np.zeros((0, 2), dtype=np.int32)
+        else:
+            tree = cKDTree(positions)
+            pairs = tree.query_pairs(self.eps + self._margin, output_type="ndarray")
+        first, second = pairs[:, 0].astype(np.int32), pairs[:, 1].astype(np.int32)
+        order = self._order(first, second, len(positions))
+        self._first, self._second = first[order], second[order]
+
+    @staticmethod
+    def _order(first: np.ndarray, second: np.ndarray, n: int) -> np.ndarray:
+        """Return the order that sorts pairs by their first and then their second point."""
+        return np.argsort(first.astype(np.int64) * n + second)
+
+
+def label_pairs(
+    n: int,
+    first: np.ndarray,
+    second: np.ndarray,
+    min_samples: int,
+    index: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the DBSCAN labels and core points given all pairs of points within eps.
+
+    Labels are identical to those of `sklearn.cluster.DBSCAN`: clusters are numbered
+    in the order of their first core point, border points get the first cluster that
+    reaches them.
+
+    Args:
+        n: the number of points
+        first: the first point of every pair
+        second: the second point of every pair, every pair is listed once, the pairs
+            are sorted by first and then by second
+        min_samples: the number of points within eps, including the point itself, for
+            a point to be a core point
+        index: the index of every point in the order that numbers the clusters, if the
+            points were reordered to find the pairs
+
+    Returns:
+        the label of every point, -1 for noise, and the sorted indices of the core points
+
+    """
+    # every point is its own neighbor
+    counts = 1 + np.bincount(first, minlength=n) + np.bincount(second, minlength=n)
+    core = counts >= min_samples
+    labels = np.full(n, -1, dtype=np.intp)
+    cores = np.flatnonzero(core)
+    if len(cores) == 0:
+        return labels, cores if index is None else np.sort(index[cores])
+
+    core_first, core_second = core[first], core[second]
+    both_core = core_first & core_second
+    # one direction of every edge is enough for undirected components, and as the
+    # pairs are sorted they already are in compressed sparse row order
+    rows, cols = first[both_core], second[both_core]
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    graph = sparse.csr_matrix((np.ones(len(rows), dtype=np.int8), cols, indptr), shape=(n, n))
+    graph.has_sorted_indices = True
+    _, components = connected_components(graph, directed=False)
+
+    # sklearn numbers clusters in the order of their first core point
+    ordered = cores if index is None else cores[np.argsort(index[cores])]
+    unique, first_core = np.unique(components[ordered], return_index=True)
+    cluster_of = np.empty(components.max() + 1, dtype=np.intp)
+    cluster_of[unique[np.argsort(first_core)]] = np.arange(len(unique))
+    labels[cores] = cluster_of[components[cores]]
+
+    # border points join the first cluster, in that order, that reaches them
+    border_first = core_first & ~core_second
+    border_second = core_second & ~core_first
+    border = np.concatenate([second[border_first], first[border_second]])
+    reaching = np.concatenate([labels[first[border_first]], labels[second[border_second]]])
+    if len(border):
+        best = np.full(n, n, dtype=np.intp)
+        np.minimum.at(best, border, reaching)
+        is_border = best < n
+        labels[is_border] = best[is_border]
+    return labels, cores if index is None else np.sort(index[cores])
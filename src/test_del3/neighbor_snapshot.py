@@ -0,0 +1,290 @@
+"""Batched neighbor computation for all agents of a continuous space.
+
+Instead of every agent issuing its own radius queries during a step, a
+`NeighborSnapshot` finds all pairs of agents within a maximum radius at once with a
+KD-tree built from a positions array, in O(n log n). The pairs are stored per agent
+in compressed sparse row form together with their squared distances, so:
+- the neighbors of an agent within any radius up to the maximum are a slice of the
+  table, filtered by distance and agent type
+- counts within a radius are computed for all agents in one vectorized pass the first
+  time they are asked for, after which every agent reads its own count in O(1)
+- the same table provides the pairs within eps that DBSCAN labels are computed from
+
+A snapshot describes the positions at the moment it was built. Agents moving
+afterwards are not tracked, agents removed afterwards can be dropped with `discard`.
+Distances follow `ContinuousSpace.get_neighbors`: an agent is a neighbor if its
+squared distance is at most the squared radius, and agents count as their own
+neighbor at distance zero.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+from mesa import Agent
+from mesa.space import ContinuousSpace
+from scipy.spatial import cKDTree
+
+AgentType = type | tuple[type, ...]
+# radius, agent type and include_center of a query
+_Query = tuple[float, AgentType | None, bool]
+
+
+class NeighborSnapshot:
+    """All pairs of agents within a maximum radius of each other, at one moment.
+
+    Attributes:
+        agents (list[Agent]): the agents in the snapshot, in the order of the space
+        positions (np.ndarray): the positions of the agents at the time of the snapshot
+        max_radius (float): the largest radius that can be queried
+
+    """
+
+    def __init__(self, space: ContinuousSpace, max_radius: float) -> None:
+        """Build the snapshot of all agents in a space.
+
+        Args:
+            space: the continuous space holding the agents
+            max_radius: the largest radius that will be queried
+        """
+        self.space = space
+        self.max_radius = max_radius
+        self.agents: list[Agent] = list(space._agent_to_index)
+        self.index: dict[Agent, int] = {agent: i for i, agent in enumerate(self.agents)}
+        n = len(self.agents)
+        self.positions = np.array([agent.pos for agent in self.agents], dtype=float).reshape(n, 2)
+
+        self._classes: list[type] = list(dict.fromkeys(type(agent) for agent in self.agents))
+        class_ids = {klass: i for i, klass in enumerate(self._classes)}
+        self._class_ids = np.array([class_ids[type(a)] for a in self.agents], dtype=np.intp)
+        self._alive = np.ones(n, dtype=bool)
+        self._discarded: set[int] = set()
+        self._type_masks: dict[AgentType | None, np.ndarray] = {}
+        self._tables: dict[_Query, tuple[list[int], list[int]]] = {}
+        self._counts: dict[_Query, np.ndarray] = {}
+        self._type_counts: dict[tuple[float, bool], np.ndarray] = {}
+
+        # candidate pairs from the tree, with a margin so that rounding in the tree
+        # never drops a pair, distances are then computed exactly like the space does
+        offset = np.array((space.x_min, space.y_min))
+        if space.torus:
+            tree = cKDTree(self.positions - offset, boxsize=space.size)
+        else:
+            tree = cKDTree(self.positions)
+        pairs = tree.query_pairs(max_radius * (1 + 1e-9), output_type="ndarray")
+        rows = np.concatenate([pairs[:, 0], pairs[:, 1], np.arange(n)])
+        cols = np.concatenate([pairs[:, 1], pairs[:, 0], np.arange(n)])
+
+        # neighbors of every agent in the order of the space
+        order = np.argsort(rows * n + cols)
+        self._rows = rows[order]
+        self._cols = cols[order]
+        deltas = np.abs(self.positions[self._rows] - self.positions[self._cols])
+        if space.torus:
+            deltas = np.minimum(deltas, space.size - deltas)
+        self._dists = deltas[:, 0] ** 2 + deltas[:, 1] ** 2
+        self._indptr = np.zeros(n + 1, dtype=np.intp)
+        np.cumsum(np.bincount(self._rows, minlength=n), out=self._indptr[1:])
+
+    def __contains__(self, agent: Agent) -> bool:  # noqa: D105
+        return agent in self.index
+
+    def _type_mask(self, agent_type: AgentType | None) -> np.ndarray:
+        """Return for every class in the snapshot whether it matches agent_type."""
+        try:
+            return self._type_masks[agent_type]
+        except KeyError:
+            mask = np.array(
+                [agent_type is None or issubclass(k, agent_type) for k in self._classes],
+                dtype=bool,
+            ).reshape(-1)
+            self._type_masks[agent_type] = mask
+            return mask
+
+    def _check_radius(self, radius: float) -> None:
+        if radius > self.max_radius:
+            raise ValueError(
+                f"radius {radius} is larger than the radius of the snapshot {self.max_radius}"
+            )
+
+    def _selected(
+        self, radius: float, agent_type: AgentType | None, include_center: bool
+    ) -> np.ndarray:
+        """Return a mask of the entries of the table that match a query."""
+        self._check_radius(radius)
+        selected = self._within(self._dists, radius, include_center)
+        selected &= self._alive[self._cols]
+        if agent_type is not None:
+            selected &= self._type_mask(agent_type)[self._class_ids[self._cols]]
+        return selected
+
+    def _table(
+        self, radius: float, agent_type: AgentType | None, include_center: bool
+    ) -> tuple[list[int], list[int]]:
+        """Return the neighbors of all agents for a query, as (indptr, indices) lists.
+
+        Tables are filtered for all agents at once the first time a query is made and
+        cached, later queries with the same arguments only slice them.
+        """
+        key = (radius, agent_type, include_center)
+        try:
+            return self._tables[key]
+        except KeyError:
+            pass
+        selected = self._selected(radius, agent_type, include_center)
+        indptr = np.zeros(len(self.agents) + 1, dtype=np.intp)
+        np.cumsum(
+            np.bincount(self._rows[selected], minlength=len(self.agents)), out=indptr[1:]
+        )
+        table = (indptr.tolist(), self._cols[selected].tolist())
+        self._tables[key] = table
+        return table
+
+    def get_neighbors(
+        self,
+        agent: Agent,
+        radius: float,
+        agent_type: AgentType | None = None,
+        include_center: bool = True,
+    ) -> list[Agent]:
+        """Return the agents within radius of an agent, in the order of the space.
+
+        Args:
+            agent: the agent at the center of the query
+            radius: the radius of the query, at most max_radius
+            agent_type: only return agents of this class or tuple of classes
+            include_center: include agents at distance zero, including agent itself
+
+        """
+        indptr, indices = self._table(radius, agent_type, include_center)
+        i = self.index[agent]
+        neighbors = indices[indptr[i] : indptr[i + 1]]
+        agents = self.agents
+        if self._discarded:
+            discarded = self._discarded
+            return [agents[j] for j in neighbors if j not in discarded]
+        return [agents[j] for j in neighbors]
+
+    def counts(
+        self,
+        radius: float,
+        agent_type: AgentType | None = None,
+        include_center: bool = True,
+    ) -> np.ndarray:
+        """Return for every agent of the snapshot the number of agents within radius.
+
+        The counts are computed for all agents at once and cached.
+
+        Args:
+            radius: the radius of the query, at most max_radius
+            agent_type: only count agents of this class or tuple of classes
+            include_center: count agents at distance zero, including the agent itself
+
+        """
+        key = (radius, agent_type, include_center)
+        try:
+            return self._counts[key]
+        except KeyError:
+            pass
+        selected = self._selected(radius, agent_type, include_center)
+        counts = np.bincount(self._rows[selected], minlength=len(self.agents))
+        self._counts[key] = counts
+        return counts
+
+    def count_neighbors(
+        self,
+        agent: Agent,
+        radius: float,
+        agent_type: AgentType | None = None,
+        include_center: bool = True,
+    ) -> int:
+        """Return the number of agents within radius of an agent.
+
+        Args:
+            agent: the agent at the center of the query
+            radius: the radius of the query, at most max_radius
+            agent_type: only count agents of this class or tuple of classes
+            include_center: count agents at distance zero, including agent itself
+
+        """
+        return int(self.counts(radius, agent_type, include_center)[self.index[agent]])
+
+    def count_neighbors_by_type(
+        self, agent: Agent, radius: float, include_center: bool = True
+    ) -> dict[type, int]:
+        """Return the number of agents of every class within radius of an agent.
+
+        Args:
+            agent: the agent at the center of the query
+            radius: the radius of the query, at most max_radius
+            include_center: count agents at distance zero, including agent itself
+
+        Returns:
+            the number of agents per agent class, classes without agents within radius are left out
+
+        """
+        key = (radius, include_center)
+        type_counts = self._type_counts.get(key)
+        if type_counts is None:
+            # one count per agent and class, computed for all agents at once
+            selected = self._selected(radius, None, include_center)
+            k = len(self._classes)
+            type_counts = np.bincount(
+                self._rows[selected] * k + self._class_ids[self._cols[selected]],
+                minlength=len(self.agents) * k,
+            ).reshape(len(self.agents), k)
+            self._type_counts[key] = type_counts
+        return {
+            klass: count
+            for klass, count in zip(self._classes, type_counts[self.index[agent]].tolist())
+            if count
+        }
+
+    def discard(self, agent: Agent) -> None:
+        """Drop an agent that was removed from the model from all later query results."""
+        i = self.index.get(agent)
+        if i is None or not self._alive[i]:
+            return
+        self._alive[i] = False
+        self._discarded.add(i)
+        # keep the cached counts of the agents around it up to date
+        start, stop = self._indptr[i], self._indptr[i + 1]
+        cols = self._cols[start:stop]
+        dists = self._dists[start:stop]
+        class_id = self._class_ids[i]
+        for (radius, agent_type, include_center), counts in self._counts.items():
+            if self._type_mask(agent_type)[class_id]:
+                counts[cols[self._within(dists, radius, include_center)]] -= 1
+        for (radius, include_center), type_counts in self._type_counts.items():
+            type_counts[cols[self._within(dists, radius, include_center)], class_id] -= 1
+
+    @staticmethod
+    def _within(dists: np.ndarray, radius: float, include_center: bool) -> np.ndarray:
+        within = dists <= radius**2
+        if not include_center:
+            within &= dists > 0
+        return within
+
+    def pairs_within(self, agents: Sequence[Agent], radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """Return the pairs of some agents within radius of each other.
+
+        Every pair is listed once, as the indices of its agents in agents, the smaller
+        index first, and the pairs are sorted by their first and then by their second
+        index, the form `incremental_dbscan.label_pairs` clusters directly.
+
+        Args:
+            agents: the agents to include, all of them must be part of the snapshot
+            radius: the largest distance to include, at most max_radius
+
+        """
+        self._check_radius(radius)
+        position = np.full(len(self.agents), -1, dtype=np.int32)
+        position[[self.index[agent] for agent in agents]] = np.arange(len(agents))
+
+        first = position[self._rows]
+        second = position[self._cols]
+        selected = (first >= 0) & (first < second) & (self._dists <= radius**2)
+        first, second = first[selected], second[selected]
+        order = np.lexsort((second, first))
+        return first[order], second[order]
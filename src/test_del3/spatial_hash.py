@@ -0,0 +1,316 @@
+"""Uniform grid spatial hash for continuous spaces.
+
+`mesa.space.ContinuousSpace.get_neighbors` computes the distance to every agent in
+the space, so each radius query costs O(agents) and a step in which every agent
+looks around costs O(agents²). `HashedContinuousSpace` additionally sorts agents
+into buckets of a fixed size, one set of buckets per agent class. The
+buckets are updated whenever an agent is placed, moved or removed, and a radius
+query only visits the buckets that overlap the query circle.
+
+Queries return exactly the agents `ContinuousSpace.get_neighbors` returns, in the
+same order (the order in which agents were placed), so the hashed space can replace
+a `ContinuousSpace` without changing model results.
+
+Because the buckets are kept per agent class, queries restricted to an agent type
+only look at the positions of agents of that type. Agents that only need to know how
+many neighbors of some type they have can use `count_neighbors` or
+`count_neighbors_by_type`, which never build or sort agent lists.
+
+Code that changes the positions of many agents without `move_agent`, e.g. by
+writing an `AgentTable` column, calls `positions_changed` afterwards, and the
+buckets are rebuilt from the agent positions before the next query.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterator
+
+from mesa import Agent
+from mesa.space import ContinuousSpace, FloatCoordinate
+
+AgentType = type | tuple[type, ...]
+
+
+class HashedContinuousSpace(ContinuousSpace):
+    """Continuous space with a uniform grid spatial hash for radius queries.
+
+    The bucket size should be close to the radii used in queries: small buckets
+    mean many buckets per query, large buckets mean many candidate agents whose
+    distance has to be checked.
+
+    Attributes:
+        cell_size (float): the maximum side length of the buckets, buckets are shrunk
+            slightly so that they tile the space exactly
+
+    """
+
+    def __init__(
+        self,
+        x_max: float,
+        y_max: float,
+        torus: bool,
+        x_min: float = 0,
+        y_min: float = 0,
+        cell_size: float = 8.0,
+    ) -> None:
+        """Create a new continuous space with a spatial hash.
+
+        Args:
+            x_max: the maximum x-coordinate
+            y_max: the maximum y-coordinate
+            torus: Boolean for whether the edges loop around
+            x_min: the minimum x-coordinate
+            y_min: the minimum y-coordinate
+            cell_size: the maximum side length of the buckets of the hash
+        """
+        super().__init__(x_max, y_max, torus, x_min, y_min)
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        # buckets tile the space exactly, so they can wrap around on a torus
+        self._nx = max(1, math.ceil(self.width / cell_size))
+        self._ny = max(1, math.ceil(self.height / cell_size))
+        self._bucket_width = self.width / self._nx
+        self._bucket_height = self.height / self._ny
+        # per agent class: bucket id -> {agent: (x, y, placement order)},
+        # positions as Python floats
+        self._buckets: dict[type, dict[int, dict[Agent, tuple[float, float, int]]]] = {}
+        self._bucket_of: dict[Agent, int] = {}
+        # placement order of the agents, ContinuousSpace returns neighbors in this order
+        self._order: dict[Agent, int] = {}
+        self._next_order = 0
+        # positions were changed without move_agent, the buckets have to be rebuilt
+        self._stale = False
+
+    def _bucket_id(self, x: float, y: float) -> int:
+        bx = min(int((x - self.x_min) // self._bucket_width), self._nx - 1)
+        by = min(int((y - self.y_min) // self._bucket_height), self._ny - 1)
+        return bx * self._ny + by
+
+    def place_agent(self, agent: Agent, pos: FloatCoordinate) -> None:
+        """Place a new agent in the space.
+
+        Args:
+            agent: Agent object to place.
+            pos: Coordinate tuple for where to place the agent.
+        """
+        super().place_agent(agent, pos)
+        x, y = float(agent.pos[0]), float(agent.pos[1])
+        bucket_id = self._bucket_id(x, y)
+        buckets = self._buckets.setdefault(type(agent), {})
+        buckets.setdefault(bucket_id, {})[agent] = (x, y, self._next_order)
+        self._bucket_of[agent] = bucket_id
+        self._order[agent] = self._next_order
+        self._next_order += 1
+
+    def move_agent(self, agent: Agent, pos: FloatCoordinate) -> None:
+        """Move an agent from its current position to a new position.
+
+        Args:
+            agent: The agent object to move.
+            pos: Coordinate tuple to move the agent to.
+        """
+        super().move_agent(agent, pos)
+        x, y = float(agent.pos[0]), float(agent.pos[1])
+        bucket_id = self._bucket_id(x, y)
+        old_id = self._bucket_of[agent]
+        buckets = self._buckets[type(agent)]
+        if bucket_id != old_id:
+            bucket = buckets[old_id]
+            del bucket[agent]
+            if not bucket:
+                del buckets[old_id]
+            self._bucket_of[agent] = bucket_id
+            buckets.setdefault(bucket_id, {})[agent] = (x, y, self._order[agent])
+        else:
+            buckets[bucket_id][agent] = (x, y, self._order[agent])
+
+    def remove_agent(self, agent: Agent) -> None:
+        """Remove an agent from the space.
+
+        Args:
+            agent: The agent object to remove
+        """
+        super().remove_agent(agent)
+        bucket_id = self._bucket_of.pop(agent)
+        del self._order[agent]
+        buckets = self._buckets[type(agent)]
+        bucket = buckets[bucket_id]
+        del bucket[agent]
+        if not bucket:
+            del buckets[bucket_id]
+
+    def positions_changed(self) -> None:
+        """Mark the positions of the agents as changed without `move_agent`.
+
+        The buckets and the position cache of the space are rebuilt from the positions
+        of the agents the next time they are needed.
+        """
+        self._stale = True
+        self._invalidate_agent_cache()
+
+    def _rebuild_buckets(self) -> None:
+        self._buckets = {}
+        for agent, order in self._order.items():
+            x, y = float(agent.pos[0]), float(agent.pos[1])
+            bucket_id = self._bucket_id(x, y)
+            buckets = self._buckets.setdefault(type(agent), {})
+            buckets.setdefault(bucket_id, {})[agent] = (x, y, order)
+            self._bucket_of[agent] = bucket_id
+        self._stale = False
+
+    def _bucket_range(
+        self, lower: float, upper: float, minimum: float, size: float, n: int
+    ) -> range | list[int]:
+        # the margin guards against rounding at bucket edges, distances are checked exactly
+        first = math.floor((lower - minimum) / size - 1e-9)
+        last = math.floor((upper - minimum) / size + 1e-9)
+        if not self.torus:
+            return range(max(first, 0), min(last, n - 1) + 1)
+        if last - first + 1 >= n:
+            return range(n)
+        return [b % n for b in range(first, last + 1)]
+
+    def _hits(
+        self,
+        pos: FloatCoordinate,
+        radius: float,
+        include_center: bool,
+        agent_type: AgentType | None,
+    ) -> Iterator[tuple[type, Agent, int, float]]:
+        """Yield (class, agent, placement order, squared distance) of the agents within radius."""
+        if self._stale:
+            self._rebuild_buckets()
+        x, y = float(pos[0]), float(pos[1])
+        xs = self._bucket_range(
+            x - radius, x + radius, self.x_min, self._bucket_width, self._nx
+        )
+        ys = self._bucket_range(
+            y - radius, y + radius, self.y_min, self._bucket_height, self._ny
+        )
+        ny = self._ny
+        r2 = radius**2
+        width, height = self.width, self.height
+
+        for klass, buckets in self._buckets.items():
+            if agent_type is not None and not issubclass(klass, agent_type):
+                continue
+            for bx in xs:
+                for by in ys:
+                    bucket = buckets.get(bx * ny + by)
+                    if bucket is None:
+                        continue
+                    if self.torus:
+                        for agent, (ax, ay, order) in bucket.items():
+                            dx = abs(ax - x)
+                            dy = abs(ay - y)
+                            dx = min(dx, width - dx)
+                            dy = min(dy, height - dy)
+                            d2 = dx * dx + dy * dy
+                            if d2 <= r2 and (include_center or d2 > 0):
+                                yield klass, agent, order, d2
+                    else:
+                        # squaring makes the sign of the differences irrelevant
+                        for agent, (ax, ay, order) in bucket.items():
+                            dx = ax - x
+                            dy = ay - y
+                            d2 = dx * dx + dy * dy
+                            if d2 <= r2 and (include_center or d2 > 0):
+                                yield klass, agent, order, d2
+
+    def _query(
+        self,
+        pos: FloatCoordinate,
+        radius: float,
+        include_center: bool,
+        agent_type: AgentType | None,
+    ) -> list[tuple[int, Agent, float]]:
+        """Return (placement order, agent, squared distance) of the agents within radius."""
+        hits = [
+            (order, agent, d2)
+            for _, agent, order, d2 in self._hits(pos, radius, include_center, agent_type)
+        ]
+        # placement orders are unique, so agents themselves are never compared
+        hits.sort()
+        return hits
+
+    def get_neighbors(
+        self,
+        pos: FloatCoordinate,
+        radius: float,
+        include_center: bool = True,
+        agent_type: AgentType | None = None,
+    ) -> list[Agent]:
+        """Get all agents within a certain radius.
+
+        Args:
+            pos: (x,y) coordinate tuple to center the search at.
+            radius: Get all the objects within this distance of the center.
+            include_center: If True, include an object at the *exact* provided
+                            coordinates.
+            agent_type: only return agents of this class or tuple of classes
+
+        """
+        return [agent for _, agent, _ in self._query(pos, radius, include_center, agent_type)]
+
+    def get_neighbors_with_distances(
+        self,
+        pos: FloatCoordinate,
+        radius: float,
+        include_center: bool = True,
+        agent_type: AgentType | None = None,
+    ) -> list[tuple[Agent, float]]:
+        """Get all agents within a certain radius together with their distance.
+
+        Args:
+            pos: (x,y) coordinate tuple to center the search at.
+            radius: Get all the objects within this distance of the center.
+            include_center: If True, include an object at the *exact* provided
+                            coordinates.
+            agent_type: only return agents of this class or tuple of classes
+
+        """
+        return [
+            (agent, math.sqrt(d2))
+            for _, agent, d2 in self._query(pos, radius, include_center, agent_type)
+        ]
+
+    def count_neighbors(
+        self,
+        pos: FloatCoordinate,
+        radius: float,
+        agent_type: AgentType | None = None,
+        include_center: bool = True,
+    ) -> int:
+        """Count the agents within a certain radius without building a list of them.
+
+        Args:
+            pos: (x,y) coordinate tuple to center the search at.
+            radius: Count the objects within this distance of the center.
+            agent_type: only count agents of this class or tuple of classes
+            include_center: If True, count an object at the *exact* provided
+                            coordinates.
+
+        """
+        return sum(1 for _ in self._hits(pos, radius, include_center, agent_type))
+
+    def count_neighbors_by_type(
+        self, pos: FloatCoordinate, radius: float, include_center: bool = True
+    ) -> dict[type, int]:
+        """Count the agents of every class within a certain radius in a single query.
+
+        Args:
+            pos: (x,y) coordinate tuple to center the search at.
+            radius: Count the objects within this distance of the center.
+            include_center: If True, count an object at the *exact* provided
+                            coordinates.
+
+        Returns:
+            the number of agents per agent class, classes without agents within radius are left out
+
+        """
+        counts: dict[type, int] = {}
+        for klass, _, _, _ in self._hits(pos, radius, include_center, None):
+            counts[klass] = counts.get(klass, 0) + 1
+        return counts
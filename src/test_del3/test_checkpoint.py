@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from checkpoint import dumps_checkpoint, latest_checkpoint, load_checkpoint, loads_checkpoint
+from demo_03 import SocialMediaModel
+
+
+def run_model(model, steps):
+    for _ in range(steps):
+        model.step()
+    return model
+
+
+def assert_same_run(a, b):
+    assert a.datacollector.get_model_vars_dataframe().equals(b.datacollector.get_model_vars_dataframe())
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"async_detection": True, "detection_lag": 1},
+        {"async_detection": True, "detection_lag": 3, "cluster_backend": "grid"},
+    ],
+)
+def test_resume_from_checkpoint(tmp_path, kwargs):
+    run_model(SocialMediaModel(seed=5, checkpoint_dir=tmp_path, checkpoint_every=4, **kwargs), 10)
+    path = latest_checkpoint(tmp_path)
+    assert path.name == "checkpoint_00000008.pkl"
+
+    resumed = run_model(load_checkpoint(path), 12)
+    assert resumed.checkpointer.steps == 20
+    assert_same_run(resumed, run_model(SocialMediaModel(seed=5, **kwargs), 20))
+
+
+def test_checkpoint_while_audit_runs():
+    model = SocialMediaModel(seed=3, async_detection=True, detection_lag=2)
+    detect = model.detection.detect
+
+    def slow_detect(frozen):
+        # the model is pickled while the worker is still clustering
+        time.sleep(0.2)
+        return detect(frozen)
+
+    model.detection.detect = slow_detect
+    copies = []
+    for _ in range(4):
+        model.step()
+        copy = loads_checkpoint(dumps_checkpoint(model), restore_global_random=False)
+        assert copy.cluster_detector._fits == model.cluster_detector._fits
+        copies.append(copy)
+    run_model(model, 4)
+    for done, copy in enumerate(copies, start=1):
+        assert_same_run(run_model(copy, 8 - done), model)
+
+
+def test_fork_without_changes_continues_the_run():
+    model = run_model(SocialMediaModel(seed=2, async_detection=True, detection_lag=1), 5)
+    branches = model.fork(2, steps=5, processes=1)
+    run_model(model, 5)
+    for branch in branches:
+        assert branch.checkpointer is None
+        assert_same_run(branch, model)
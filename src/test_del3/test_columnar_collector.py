@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from columnar_collector import ColumnarDataCollector
+
+
+class Counter:
+    def __init__(self):
+        self.steps = 0
+
+
+def collect(steps, **reporters):
+    collector = ColumnarDataCollector(reporters, planned_steps=2)
+    model = Counter()
+    for _ in range(steps):
+        model.steps += 1
+        collector.collect(model)
+    return collector
+
+
+def test_grows_and_widens():
+    collector = collect(
+        5, count=lambda m: m.steps, mean=lambda m: m.steps if m.steps < 3 else m.steps / 2
+    )
+    assert collector.model_vars["count"].tolist() == [1, 2, 3, 4, 5]
+    assert collector.model_vars["mean"].tolist() == [1, 2, 1.5, 2, 2.5]
+
+
+def test_array_reporters_get_one_column_per_element():
+    collector = collect(3, histogram=lambda m: np.array([m.steps, 2 * m.steps]))
+    frame = collector.get_model_vars_dataframe()
+    assert list(frame.columns) == ["histogram[0]", "histogram[1]"]
+    assert frame["histogram[1]"].tolist() == [2, 4, 6]
+
+
+def test_changed_shape_raises():
+    with pytest.raises(ValueError, match="histogram"):
+        collect(3, histogram=lambda m: np.zeros(m.steps))
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    collector = collect(
+        5,
+        count=lambda m: m.steps,
+        heat=lambda m: m.steps / 4,
+        histogram=lambda m: np.arange(3) * m.steps,
+    )
+    path = tmp_path / "data.parquet"
+    collector.to_parquet(str(path))
+    table = pq.read_table(path)
+    assert table.equals(collector.to_arrow())
+    assert table.column("count").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("heat").to_pylist() == [0.25, 0.5, 0.75, 1.0, 1.25]
+    assert table.column("histogram").to_pylist() == [[0, i, 2 * i] for i in range(1, 6)]
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from mesa import Agent, Model
+from mesa.space import ContinuousSpace
+from sklearn.cluster import DBSCAN
+
+from dbscan_backends import make_dbscan
+from grid_dbscan import GridDBSCAN
+from incremental_dbscan import IncrementalDBSCAN, label_pairs
+from neighbor_snapshot import NeighborSnapshot
+
+EPS = 8
+MIN_SAMPLES = 5
+
+
+def blobs(rng, n, dimensions=2):
+    centers = rng.uniform(0, 100, (5, dimensions))
+    return centers[rng.integers(0, 5, n)] + rng.normal(0, 4, (n, dimensions))
+
+
+def assert_same_as_sklearn(engine, positions):
+    expected = DBSCAN(eps=EPS, min_samples=MIN_SAMPLES).fit(positions)
+    np.testing.assert_array_equal(engine.labels_, expected.labels_)
+    np.testing.assert_array_equal(engine.core_sample_indices_, expected.core_sample_indices_)
+
+
+def frames(seed):
+    """Yield the positions and ids of a population that moves, shrinks, grows and reorders."""
+    rng = np.random.default_rng(seed)
+    positions = blobs(rng, 400)
+    ids = np.arange(400)
+    yield positions, ids
+    for _ in range(3):
+        # a few points move a little
+        moved = rng.random(len(ids)) < 0.1
+        positions = positions + moved[:, None] * rng.normal(0, 1, positions.shape)
+        yield positions, ids
+    # all points move a lot
+    positions = positions + rng.normal(0, 3, positions.shape)
+    yield positions, ids
+    # points are removed
+    kept = rng.random(len(ids)) > 0.2
+    positions, ids = positions[kept], ids[kept]
+    yield positions, ids
+    # the order changes
+    order = rng.permutation(len(ids))
+    positions, ids = positions[order], ids[order]
+    yield positions, ids
+    # new points with new ids, some on top of existing points
+    positions = np.r_[positions, positions[:30], blobs(rng, 50)]
+    ids = np.r_[ids, np.arange(1000, 1080)]
+    yield positions, ids
+    # no point moves
+    yield positions, ids
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_incremental_same_as_sklearn_across_fits(seed):
+    engine = IncrementalDBSCAN(eps=EPS, min_samples=MIN_SAMPLES)
+    for positions, ids in frames(seed):
+        engine.fit(positions, ids)
+        assert_same_as_sklearn(engine, positions)
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("dimensions", [1, 2, 3])
+def test_grid_same_as_sklearn(seed, dimensions):
+    rng = np.random.default_rng(seed)
+    positions = blobs(rng, 500, dimensions)
+    # duplicates and points on cell borders
+    positions = np.r_[positions, positions[:40], np.round(positions[40:80] / EPS) * EPS]
+    assert_same_as_sklearn(GridDBSCAN(eps=EPS, min_samples=MIN_SAMPLES).fit(positions), positions)
+
+
+def test_grid_far_apart_points():
+    rng = np.random.default_rng(0)
+    positions = np.r_[
+        blobs(rng, 100, 3),
+        blobs(rng, 100, 3) + 1e7,
+        [[0, 0, 0], [1e12, -1e12, 1e12]],
+    ]
+    assert_same_as_sklearn(GridDBSCAN(eps=EPS, min_samples=MIN_SAMPLES).fit(positions), positions)
+
+
+@pytest.mark.parametrize("backend", ["incremental", "grid", "sklearn"])
+def test_backends_same_labels(backend):
+    engine = make_dbscan(backend, eps=EPS, min_samples=MIN_SAMPLES)
+    for positions, ids in frames(7):
+        assert_same_as_sklearn(engine.fit(positions, ids), positions)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_dbscan("optics", eps=EPS, min_samples=MIN_SAMPLES)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_snapshot_pairs_same_as_sklearn(seed):
+    rng = np.random.default_rng(seed)
+    model = Model(seed=seed)
+    space = ContinuousSpace(120, 120, torus=False)
+    agents = [Agent(model) for _ in range(300)]
+    for agent, position in zip(agents, np.clip(blobs(rng, 300), 0, 119.9)):
+        space.place_agent(agent, tuple(position))
+    snapshot = NeighborSnapshot(space, 10)
+    # a subset of the agents, in another order than the space
+    bots = [agents[i] for i in rng.permutation(300)[:200]]
+    positions = np.array([bot.pos for bot in bots])
+
+    first, second = snapshot.pairs_within(bots, EPS)
+    labels, core = label_pairs(len(bots), first, second, MIN_SAMPLES)
+    expected = DBSCAN(eps=EPS, min_samples=MIN_SAMPLES).fit(positions)
+    np.testing.assert_array_equal(labels, expected.labels_)
+    np.testing.assert_array_equal(core, expected.core_sample_indices_)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+import demo_03
+from demo_03 import AdBotAgent, ShillBotAgent, SocialMediaModel, UserAgent
+
+METRICS = ["Active Ad Bots", "Active Shill Bots", "User Engagement", "User Deception", "Average Post Heat"]
+
+
+def run_model(seed, steps, **kwargs):
+    model = SocialMediaModel(seed=seed, **kwargs)
+    for _ in range(steps):
+        model.step()
+    return model
+
+
+def final_metrics(seeds, steps, **kwargs):
+    rows = [
+        run_model(seed, steps, **kwargs).datacollector.get_model_vars_dataframe().iloc[-1]
+        for seed in seeds
+    ]
+    return {metric: np.array([row[metric] for row in rows], dtype=float) for metric in METRICS}
+
+
+def test_columnar_identical_to_objects():
+    objects = run_model(1, 30).datacollector.get_model_vars_dataframe()
+    columnar = run_model(1, 30, columnar=True).datacollector.get_model_vars_dataframe()
+    assert objects.equals(columnar)
+
+
+@pytest.mark.parametrize("detection", [0.2, 0.5])
+def test_vectorized_statistically_equivalent(detection):
+    seeds = range(16)
+    per_agent = final_metrics(seeds, 30, detection=detection)
+    vectorized = final_metrics(seeds, 30, detection=detection, vectorized=True)
+    for metric in METRICS:
+        a, b = per_agent[metric], vectorized[metric]
+        # the same distribution: neither the means nor the shapes differ significantly
+        assert stats.ttest_ind(a, b, equal_var=False).pvalue > 0.01, metric
+        assert stats.ks_2samp(a, b).pvalue > 0.01, metric
+        # and the means agree within a fraction of the spread between runs
+        spread = max(np.std(a), np.std(b), 1e-9)
+        assert abs(a.mean() - b.mean()) < spread, metric
+
+
+def test_vectorized_keeps_model_consistent():
+    model = run_model(3, 20, vectorized=True)
+    for agent_class in (AdBotAgent, ShillBotAgent, UserAgent):
+        table = model.tables[agent_class]
+        assert sorted(a.unique_id for a in table.agents) == sorted(
+            model.schedule.agents_by_type[agent_class]
+        )
+        for row, agent in enumerate(table.agents):
+            assert agent._row == row
+            assert tuple(table.column("pos")[row]) == agent.pos
+
+    positions = np.array([agent.pos for agent in model.space.agents])
+    assert (positions >= 0).all()
+    assert (positions < [demo_03.SPACE_DIMENSIONS["x_max"], demo_03.SPACE_DIMENSIONS["y_max"]]).all()
+
+    # the spatial hash follows positions written to the tables
+    user = model.tables[UserAgent].agents[0]
+    expected = [
+        agent
+        for agent in model.space.agents
+        if (agent.pos[0] - user.pos[0]) ** 2 + (agent.pos[1] - user.pos[1]) ** 2 <= 8**2
+    ]
+    assert model.space.get_neighbors(user.pos, 8) == expected
+
+
+def test_vectorized_shills_follow_live_targets():
+    model = run_model(4, 15, vectorized=True, detection=0.8)
+    shills = model.tables[ShillBotAgent]
+    ad_ids = set(model.tables[AdBotAgent].column("unique_id").tolist())
+    following = shills.column("target_kind") == 1
+    assert set(shills.column("target_id")[following].tolist()) <= ad_ids
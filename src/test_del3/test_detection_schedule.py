@@ -0,0 +1,47 @@
+import pytest
+
+from detection_schedule import DetectionScheduler
+
+
+def make_scheduler(log, **kwargs):
+    steps = []
+    scheduler = DetectionScheduler(
+        prepare=lambda: len(steps),
+        detect=lambda frozen: frozen * 10,
+        apply=lambda frozen, result: log.append((len(steps), frozen, result)),
+        **kwargs,
+    )
+    return scheduler, steps
+
+
+def run(scheduler, steps, n):
+    for _ in range(n):
+        steps.append(None)  # the agents move
+        scheduler.step()
+
+
+def test_synchronous_audits_apply_at_once():
+    log = []
+    scheduler, steps = make_scheduler(log, interval=2)
+    run(scheduler, steps, 6)
+    assert log == [(2, 2, 20), (4, 4, 40), (6, 6, 60)]
+
+
+@pytest.mark.parametrize("lag", [None, 1, 3])
+def test_asynchronous_audits_apply_after_the_agents_moved(lag):
+    log = []
+    scheduler, steps = make_scheduler(log, asynchronous=True, lag=lag)
+    assert scheduler.lag == (lag or 1)
+    run(scheduler, steps, 6)
+    scheduler.close()
+    applied = [step for step, _, _ in log]
+    started = [frozen for _, frozen, _ in log]
+    assert started == [1, 2, 3, 4, 5, 6]
+    # results of the last audits are applied by close
+    assert applied[: 6 - scheduler.lag] == [s + scheduler.lag for s in started[: 6 - scheduler.lag]]
+
+
+def test_asynchronous_audits_need_a_lag():
+    with pytest.raises(ValueError):
+        DetectionScheduler(lambda: None, lambda frozen: None, lambda frozen, result: None,
+                           asynchronous=True, lag=0)